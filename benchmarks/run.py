@@ -0,0 +1,134 @@
+"""Times pedpol's main functions on simulated pedigrees of increasing size
+
+Each function & size runs in its own process, so the peak memory reported is for
+that call alone. Pedigrees are simulated once per size (see `simulate_pedigree`)
+and saved to Parquet in `--data-dir` for reuse.
+
+### Example use:
+```sh
+uv run python benchmarks/run.py --sizes 1e3 1e5 1e6 --output results.csv
+```"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import polars as pl
+
+from pedpol.core import PedigreeLabels
+from pedpol.generations import (
+    classify_generations,
+    get_ancestors_of,
+    get_descendants_of,
+)
+from pedpol.simulate import simulate_pedigree
+from pedpol.validation import recode_pedigree, validate_pedigree
+
+Sizes = (1e3, 1e4, 1e5, 1e6, 1e7, 3e7)
+QueryCount = 100
+
+
+def _queries(pedigree: pl.DataFrame, youngest: bool) -> pl.Series:
+    """Returns a sample of the youngest (or oldest) generation of animals"""
+    birth_year = pedigree.get_column("birth_year")
+    generation = birth_year.max() if youngest else birth_year.min()
+    animals = pedigree.filter(pl.col("birth_year") == generation).get_column("animal")
+    return animals.sample(min(QueryCount, animals.len()), seed=1)
+
+
+Cases = {
+    "classify_generations": lambda ped: classify_generations(ped, PedigreeLabels),
+    "validate_pedigree": lambda ped: validate_pedigree(
+        ped, PedigreeLabels, age_label="birth_year", sex_label="sex"
+    ),
+    "recode_pedigree": lambda ped: recode_pedigree(ped, PedigreeLabels),
+    "get_ancestors_of": lambda ped: get_ancestors_of(
+        ped, _queries(ped, youngest=True), pedigree_labels=PedigreeLabels
+    ),
+    "get_descendants_of": lambda ped: get_descendants_of(
+        ped, _queries(ped, youngest=False), pedigree_labels=PedigreeLabels
+    ),
+}
+
+
+def _peak_memory_mb() -> float:
+    """Returns the peak resident memory of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def run_case(case: str, path: Path) -> dict:
+    """Runs a single case on the pedigree at `path`, returning time & memory used"""
+    pedigree = pl.read_parquet(path)
+    loaded = _peak_memory_mb()
+    start = time.perf_counter()
+    Cases[case](pedigree)
+    seconds = time.perf_counter() - start
+    peak = _peak_memory_mb()
+    return {
+        "case": case,
+        "rows": pedigree.height,
+        "seconds": seconds,
+        "peak_mb": peak,
+        "added_mb": peak - loaded,
+    }
+
+
+def simulated_pedigree(size: int, data_dir: Path, seed: int) -> Path:
+    """Returns the path of a simulated pedigree of `size`, creating it if needed"""
+    path = data_dir / f"pedigree_{size}_{seed}.parquet"
+    if not path.exists():
+        data_dir.mkdir(parents=True, exist_ok=True)
+        generations = max(2, min(30, len(str(size)) * 3))
+        simulate_pedigree(size, generations, unknown_rate=0.1, seed=seed).write_parquet(
+            path
+        )
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=float, default=Sizes)
+    parser.add_argument("--cases", nargs="+", choices=list(Cases), default=list(Cases))
+    parser.add_argument("--data-dir", type=Path, default=Path("benchmarks/data"))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=3600)
+    parser.add_argument("--output", type=Path, help="CSV file to write results to")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    parser.add_argument("--path", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:  # running in a subprocess
+        print(json.dumps(run_case(args.case, args.path)))
+        return
+
+    results = []
+    for size in map(int, args.sizes):
+        path = simulated_pedigree(size, args.data_dir, args.seed)
+        for case in args.cases:
+            process = subprocess.run(
+                [sys.executable, __file__, "--case", case, "--path", str(path)],
+                check=False,
+                capture_output=True,
+                text=True,
+                timeout=args.timeout,
+            )
+            if process.returncode != 0:
+                print(f"{case} failed for {size} rows:\n{process.stderr}")
+                continue
+            results.append(json.loads(process.stdout.splitlines()[-1]))
+            print(results[-1])
+
+    results = pl.DataFrame(results)
+    with pl.Config(tbl_rows=-1):
+        print(results)
+    if args.output:
+        results.write_csv(args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import numpy as np
+import polars as pl
+
+from pedpol.core import PedigreeLabels
+from pedpol.index import PedigreeIndex, UnknownPosition
+
+UnknownBreed = "unknown"
+"""Default breed for the genes of unknown parents & founders without a breed"""
+
+
+def _breed_fractions(
+    index: PedigreeIndex, founder_breeds: np.ndarray, breed_count: int
+) -> np.ndarray:
+    """Returns the fraction of each breed (columns) for each position of the index
+
+    `founder_breeds` is the breed (column) of each position, used for founders,
+    & the last column is the unknown breed of unknown parents. Fractions of other
+    animals are the average of their parents', a generation at a time."""
+    size = len(index)
+    # an extra last row holds the fractions of an unknown parent
+    fractions = np.zeros((size + 1, breed_count), dtype=np.float32)
+    fractions[size, -1] = 1
+    is_founder = (index.sire == UnknownPosition) & (index.dam == UnknownPosition)
+    founders = np.flatnonzero(is_founder)
+    fractions[founders, founder_breeds[founders]] = 1
+
+    for level in index.levels():
+        level = level[~is_founder[level]]
+        sire = np.where(index.sire[level] == UnknownPosition, size, index.sire[level])
+        dam = np.where(index.dam[level] == UnknownPosition, size, index.dam[level])
+        fractions[level] = (fractions[sire] + fractions[dam]) / 2
+    return fractions[:size]
+
+
+def compute_breed_composition(
+    pedigree: pl.DataFrame | pl.LazyFrame,
+    pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    breed_label: str = "breed",
+    unknown_breed: str = UnknownBreed,
+    index: PedigreeIndex | None = None,
+) -> pl.DataFrame | pl.LazyFrame:
+    """Adds a column with the fraction of each breed in each animal
+
+    Founders (animals with both parents unknown) are entirely of their breed in
+    `breed_label` & every other animal is the average of its parents, computed a
+    generation at a time over a wide array of breed fractions. Genes from unknown
+    parents, and from founders without a breed (including parents without their
+    own record), are counted as `unknown_breed`, which may also be one of the
+    breeds. Columns are named `<breed_label>_<breed>` (e.g. `breed_HF`), sorted with
+    `unknown_breed` last & held as Float32 (exact for 24 generations). Raises
+    ValueError if the pedigree already has a column of one of those names.
+
+    ### Example use:
+    ```python
+    composition_df = compute_breed_composition(ped_df, lbls, "breed", "HF")
+    ```"""
+    animal = pedigree_labels[0]
+    if index is None:
+        index = PedigreeIndex.from_pedigree(pedigree, pedigree_labels)
+    breeds = (
+        pedigree.lazy()
+        .select(animal, pl.col(breed_label).cast(pl.String))
+        .unique(animal, keep="first")
+        .collect()
+    )
+    names = breeds.get_column(breed_label).drop_nulls().unique().sort().to_list()
+    names = [name for name in names if name != unknown_breed] + [unknown_breed]
+    founder_breeds = np.full(len(index), len(names) - 1, dtype=np.int64)
+    known = breeds.filter(pl.col(breed_label).is_not_null())
+    founder_breeds[index.lookup(known.get_column(animal))] = (
+        known.get_column(breed_label)
+        .replace_strict(names, list(range(len(names))), return_dtype=pl.Int64)
+        .to_numpy()
+    )
+
+    columns = [f"{breed_label}_{name}" for name in names]
+    if clashes := set(columns) & set(pedigree.collect_schema().names()):
+        raise ValueError(
+            f"The pedigree already has breed composition columns {sorted(clashes)}."
+        )
+
+    fractions = _breed_fractions(index, founder_breeds, len(names))
+    composition = pl.DataFrame(
+        [pl.Series(animal, index.ids)]
+        + [pl.Series(column, fractions[:, b]) for b, column in enumerate(columns)]
+    ).filter(index.has_record)
+    if isinstance(pedigree, pl.LazyFrame):
+        composition = composition.lazy()
+    return pedigree.join(composition, on=animal, how="left", maintain_order="left")
@@ -0,0 +1,148 @@
+import hashlib
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+from pedpol.core import PedigreeLabels
+
+
+def pedigree_fingerprint(
+    pedigree: pl.DataFrame | pl.LazyFrame,
+    pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    columns: tuple[str, ...] = (),
+) -> str:
+    """Returns a content fingerprint of the animal, sire & dam (and any other) columns
+
+    Row hashes are digested in order with BLAKE2b, together with the column names,
+    types & the polars version (polars' hashes are only stable within a version),
+    so the cost is a single pass over the columns.
+
+    ### Example use:
+    ```python
+    pedigree_fingerprint(ped_df, ("Child", "Father", "Mother"))
+    ```"""
+    labels = [*pedigree_labels, *columns]
+    pedigree = pedigree.lazy().select(labels)
+    hashes = pedigree.select(pl.struct(labels).hash(seed=0)).collect().to_series()
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{pl.__version__}{dict(pedigree.collect_schema())}".encode())
+    digest.update(hashes.to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _nbytes(value) -> int:
+    """Returns the approximate memory used by a cached value"""
+    if isinstance(value, (pl.DataFrame, pl.Series)):
+        return value.estimated_size()
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if hasattr(value, "__dict__"):
+        return sum(_nbytes(attribute) for attribute in vars(value).values())
+    return 0
+
+
+class PedigreeCache:
+    """LRU cache of artefacts derived from pedigrees (generations, id maps, indexes)
+
+    Artefacts are keyed on their `kind` & a `pedigree_fingerprint`, so they are
+    reused whenever the same pedigree is processed again. The least recently used
+    artefacts are evicted once they take more than `max_bytes` of memory. If a
+    `directory` is given, artefacts are also saved there as Parquet files & are
+    loaded from it when not in memory, so they persist between sessions.
+
+    ### Example use:
+    ```python
+    cache = PedigreeCache(max_bytes=2**30, directory="pedigree_cache")
+    classify_generations(ped_df, lbls, cache=cache)
+    recode_pedigree(ped_df, lbls, cache=cache)
+    ```"""
+
+    def __init__(self, max_bytes: int = 2**30, directory: str | Path | None = None):
+        self.max_bytes = max_bytes
+        self.directory = None if directory is None else Path(directory)
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self.nbytes = 0
+        self._items = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: tuple[str, str]) -> bool:
+        return key in self._items
+
+    def _path(self, kind: str, fingerprint: str) -> Path:
+        return self.directory / f"{kind}-{fingerprint}.parquet"
+
+    def get(
+        self,
+        kind: str,
+        fingerprint: str,
+        from_frame: Callable[[pl.DataFrame], any] | None = None,
+    ) -> any:
+        """Returns the cached artefact, or None if it isn't cached
+
+        `from_frame` rebuilds an artefact that isn't a DataFrame from its saved
+        frame (see `put`)."""
+        key = (kind, fingerprint)
+        if key in self._items:
+            self._items.move_to_end(key)
+            return self._items[key][0]
+        if self.directory is None or not self._path(*key).exists():
+            return None
+        value = pl.read_parquet(self._path(*key))
+        value = value if from_frame is None else from_frame(value)
+        self._remember(key, value)
+        return value
+
+    def put(
+        self,
+        kind: str,
+        fingerprint: str,
+        value: any,
+        to_frame: Callable[[any], pl.DataFrame] | None = None,
+    ) -> None:
+        """Caches an artefact, saving it to `directory` if given
+
+        `to_frame` converts an artefact that isn't a DataFrame to one for saving."""
+        key = (kind, fingerprint)
+        self._remember(key, value)
+        if self.directory is not None:
+            (value if to_frame is None else to_frame(value)).write_parquet(
+                self._path(*key)
+            )
+
+    def get_or_compute(
+        self,
+        kind: str,
+        fingerprint: str,
+        compute: Callable[[], any],
+        to_frame: Callable[[any], pl.DataFrame] | None = None,
+        from_frame: Callable[[pl.DataFrame], any] | None = None,
+    ) -> any:
+        """Returns the cached artefact, computing & caching it if needed"""
+        value = self.get(kind, fingerprint, from_frame)
+        if value is None:
+            value = compute()
+            self.put(kind, fingerprint, value, to_frame)
+        return value
+
+    def _remember(self, key: tuple[str, str], value: any) -> None:
+        """Holds an artefact in memory, evicting the least recently used to fit it"""
+        if key in self._items:
+            self.nbytes -= self._items.pop(key)[1]
+        nbytes = _nbytes(value)
+        if nbytes > self.max_bytes:
+            return
+        self._items[key] = (value, nbytes)
+        self.nbytes += nbytes
+        while self.nbytes > self.max_bytes:
+            self.nbytes -= self._items.popitem(last=False)[1][1]
+
+    def clear(self) -> None:
+        """Removes all artefacts held in memory (saved artefacts are kept)"""
+        self._items.clear()
+        self.nbytes = 0
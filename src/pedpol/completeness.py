@@ -0,0 +1,93 @@
+import numpy as np
+import polars as pl
+
+from pedpol.core import PedigreeLabels
+from pedpol.index import PedigreeIndex, UnknownPosition
+
+
+def _completeness_of(
+    index: PedigreeIndex, generations: int = 5
+) -> dict[str, np.ndarray]:
+    """Returns the completeness measures of each position of the index
+
+    Measures are built a generation at a time, parents before progeny, from those
+    of the parents. The proportion of known ancestors in each of the first
+    `generations` generations of every position is carried along for the
+    pedigree completeness index."""
+    size = len(index)
+    complete = np.zeros(size, dtype=np.int32)
+    maximum = np.zeros(size, dtype=np.int32)
+    equivalent = np.zeros(size)
+    pci = np.zeros(size)
+    known = np.zeros((size, generations), dtype=np.float32)
+    for level in index.levels():
+        sire, dam = index.sire[level], index.dam[level]
+        sire_known, dam_known = sire != UnknownPosition, dam != UnknownPosition
+        sire, dam = np.where(sire_known, sire, 0), np.where(dam_known, dam, 0)
+
+        complete[level] = np.where(
+            sire_known & dam_known, 1 + np.minimum(complete[sire], complete[dam]), 0
+        )
+        maximum[level] = np.where(
+            sire_known | dam_known,
+            1
+            + np.maximum(
+                np.where(sire_known, maximum[sire], 0),
+                np.where(dam_known, maximum[dam], 0),
+            ),
+            0,
+        )
+        equivalent[level] = (
+            sire_known * (1 + equivalent[sire]) + dam_known * (1 + equivalent[dam])
+        ) / 2
+
+        sire_line = sire_known[:, None] * known[sire]
+        dam_line = dam_known[:, None] * known[dam]
+        known[level, 0] = 1
+        known[level, 1:] = (sire_line[:, :-1] + dam_line[:, :-1]) / 2
+        sire_line, dam_line = sire_line.mean(axis=1), dam_line.mean(axis=1)
+        lines = sire_line + dam_line
+        pci[level] = np.divide(
+            2 * sire_line * dam_line, lines, out=np.zeros(level.size), where=lines > 0
+        )
+    return {
+        "pci": pci,
+        "complete_generations": complete,
+        "max_generations": maximum,
+        "equivalent_generations": equivalent,
+    }
+
+
+def compute_completeness(
+    pedigree: pl.DataFrame | pl.LazyFrame,
+    pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    generations: int = 5,
+    index: PedigreeIndex | None = None,
+) -> pl.DataFrame | pl.LazyFrame:
+    """Adds columns measuring the completeness of each animal's pedigree
+
+     * `pci`: MacCluer et al. (1983) pedigree completeness index over `generations`
+       generations, i.e. the harmonic mean of the proportion of known ancestors of
+       the sire & dam lines (0 if either parent is unknown)
+     * `complete_generations`: generations back in which all ancestors are known
+     * `max_generations`: generations back to the most distant known ancestor
+     * `equivalent_generations`: equivalent complete generations, the sum over all
+       known ancestors of (1/2)^n, where n is the generations back to the ancestor
+
+    All are computed in a single pass over the pedigree, parents before progeny.
+    Parents without their own record are treated as founders.
+
+    ### Example use:
+    ```python
+    completeness_df = compute_completeness(ped_df, lbls)
+    completeness_df.group_by("birth_year").agg(pl.col("pci").mean())
+    ```"""
+    animal = pedigree_labels[0]
+    if index is None:
+        index = PedigreeIndex.from_pedigree(pedigree, pedigree_labels)
+    completeness = pl.DataFrame(
+        {animal: index.ids, **_completeness_of(index, generations)}
+    ).filter(index.has_record)
+    if isinstance(pedigree, pl.LazyFrame):
+        completeness = completeness.lazy()
+    return pedigree.join(completeness, on=animal, how="left", maintain_order="left")
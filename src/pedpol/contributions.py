@@ -0,0 +1,280 @@
+from collections.abc import Collection
+
+import numpy as np
+import polars as pl
+
+from pedpol.core import PedigreeLabels
+from pedpol.index import PedigreeIndex, UnknownPosition
+from pedpol.relationships import _trace_ancestors
+
+
+def _ancestor_subgraph(
+    index: PedigreeIndex, positions: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, list[np.ndarray]]:
+    """Returns the ancestors of `positions` (including themselves) as a subgraph
+
+    Returns the index positions of the ancestors, their parents as positions in the
+    subgraph (or `UnknownPosition`) & the subgraph positions grouped by generation,
+    earliest generation first."""
+    ancestors = index.ancestors_of(positions, generations=len(index))
+    local = np.full(len(index), UnknownPosition, dtype=np.int64)
+    local[ancestors] = np.arange(ancestors.size)
+    sire, dam = index.sire[ancestors], index.dam[ancestors]
+    sire = np.where(sire == UnknownPosition, UnknownPosition, local[sire])
+    dam = np.where(dam == UnknownPosition, UnknownPosition, local[dam])
+
+    generation = index.generations()[ancestors]
+    order = np.argsort(generation, kind="stable")
+    levels = np.split(order, np.cumsum(np.bincount(generation))[:-1])
+    return ancestors, sire, dam, levels
+
+
+def _propagate_to_parents(
+    contribution: np.ndarray,
+    sire: np.ndarray,
+    dam: np.ndarray,
+    levels: list[np.ndarray],
+) -> np.ndarray:
+    """Passes half of each animal's contribution to each known parent, youngest first
+
+    Returns the total expected contribution of every animal, i.e. its own plus half
+    of each of its progeny's."""
+    contribution = contribution.copy()
+    for level in reversed(levels):
+        half = contribution[level] / 2
+        for parent in (sire[level], dam[level]):
+            known = parent != UnknownPosition
+            np.add.at(contribution, parent[known], half[known])
+    return contribution
+
+
+def _propagate_from_parents(
+    selected: np.ndarray,
+    sire: np.ndarray,
+    dam: np.ndarray,
+    levels: list[np.ndarray],
+) -> np.ndarray:
+    """Returns the proportion of each animal's genes derived from `selected` animals
+
+    Selected animals have all of their genes explained, others half of each known
+    parent's, earliest generation first."""
+    explained = selected.astype(np.float64)
+    for level in levels:
+        from_parents = np.zeros(level.size)
+        for parent in (sire[level], dam[level]):
+            known = parent != UnknownPosition
+            from_parents[known] += explained[parent[known]] / 2
+        explained[level] = np.where(selected[level], 1.0, from_parents)
+    return explained
+
+
+def _reference_positions(
+    index: PedigreeIndex, reference_ids: Collection[any] | pl.Series | None
+) -> np.ndarray:
+    """Returns positions of the reference population (default all animals)"""
+    if reference_ids is None:
+        return np.flatnonzero(index.has_record)
+    return np.unique(index.positions(reference_ids))
+
+
+def effective_number(contributions: pl.Series | np.ndarray) -> float:
+    """Returns the effective number (1 / sum of squares) of a set of contributions
+
+    Gives the effective number of founders (fe) from `get_founder_contributions`
+    or of ancestors (fa) from `get_ancestor_contributions`."""
+    return float(1 / (np.asarray(contributions) ** 2).sum())
+
+
+def get_founder_contributions(
+    pedigree: pl.DataFrame | pl.LazyFrame,
+    reference_ids: Collection[any] | pl.Series | None = None,
+    pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    index: PedigreeIndex | None = None,
+) -> pl.DataFrame:
+    """Returns the expected contribution of each founder to a reference population
+
+    Each animal of the reference population (default all animals with a record)
+    contributes equally & contributions are passed from progeny to parents a
+    generation at a time. Founders are animals with both parents unknown, together
+    with the unknown parent of animals with only one parent known (identified by
+    the animal & a `parent` column of 'sire' or 'dam'). Contributions sum to 1, so
+    the effective number of founders (fe) is `effective_number(contribution)`.
+
+    ### Example use:
+    ```python
+    founders_df = get_founder_contributions(ped_df, reference_ids, lbls)
+    fe = effective_number(founders_df["contribution"])
+    ```"""
+    if index is None:
+        index = PedigreeIndex.from_pedigree(pedigree, pedigree_labels)
+    reference = _reference_positions(index, reference_ids)
+    ancestors, sire, dam, levels = _ancestor_subgraph(index, reference)
+    contribution = np.zeros(ancestors.size)
+    contribution[np.searchsorted(ancestors, reference)] = 1 / reference.size
+    contribution = _propagate_to_parents(contribution, sire, dam, levels)
+
+    founders = []
+    for parent, parents, other in (("sire", sire, dam), ("dam", dam, sire)):
+        unknown = np.flatnonzero(
+            (parents == UnknownPosition) & (other != UnknownPosition)
+        )
+        founders.append((unknown, parent, contribution[unknown] / 2))
+    both = np.flatnonzero((sire == UnknownPosition) & (dam == UnknownPosition))
+    founders.insert(0, (both, None, contribution[both]))
+    return pl.concat(
+        pl.DataFrame(
+            {
+                pedigree_labels[0]: index.to_ids(ancestors[positions]),
+                "parent": pl.Series([parent] * positions.size, dtype=pl.String),
+                "contribution": founder_contribution,
+            }
+        )
+        for positions, parent, founder_contribution in founders
+    ).sort("contribution", descending=True, maintain_order=True)
+
+
+def _with_phantom_parents(
+    sire: np.ndarray, dam: np.ndarray, levels: list[np.ndarray]
+) -> tuple[np.ndarray, np.ndarray, list[np.ndarray], np.ndarray, list[str | None]]:
+    """Adds a phantom parent (without parents) for the unknown parent of half-founders
+
+    Returns the extended parents & levels (phantoms first), with the subgraph
+    position of the progeny & the parent ('sire' or 'dam') each phantom replaces,
+    or the position itself & None for animals of the subgraph."""
+    size = sire.size
+    origin, role = [np.arange(size)], [None] * size
+    sire, dam = sire.copy(), dam.copy()
+    for parent, parents, other in (("sire", sire, dam), ("dam", dam, sire)):
+        half = np.flatnonzero((parents == UnknownPosition) & (other != UnknownPosition))
+        start = size + sum(o.size for o in origin[1:])
+        parents[half] = start + np.arange(half.size)
+        origin.append(half)
+        role.extend([parent] * half.size)
+    origin = np.concatenate(origin)
+    phantoms = np.arange(size, origin.size)
+    unknown = np.full(phantoms.size, UnknownPosition, dtype=sire.dtype)
+    return (
+        np.concatenate([sire, unknown]),
+        np.concatenate([dam, unknown]),
+        [phantoms, *levels],
+        origin,
+        role,
+    )
+
+
+def get_ancestor_contributions(
+    pedigree: pl.DataFrame | pl.LazyFrame,
+    reference_ids: Collection[any] | pl.Series | None = None,
+    pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    max_ancestors: int = 1000,
+    index: PedigreeIndex | None = None,
+) -> pl.DataFrame:
+    """Returns the marginal contributions of main ancestors of a reference population
+
+    Ancestors are chosen one at a time by their marginal contribution, i.e. their
+    expected contribution not already explained by previously chosen ancestors
+    (Boichard et al., 1997). Ancestors are founders & parents of the reference
+    population (default all animals with a record) or of their ancestors. As in
+    `get_founder_contributions`, the unknown parent of an animal with one known
+    parent is a phantom ancestor (identified by the animal & a `parent` column of
+    'sire' or 'dam'), so contributions sum to 1 once fully explained. The pedigree
+    of chosen ancestors is ignored when finding contributions of later ones. Up to
+    `max_ancestors` are chosen, in order, stopping early once contributions are
+    fully explained. The effective number of ancestors (fa) is
+    `effective_number(contribution)`.
+
+    Each choice needs two vectorised passes over the generations of the ancestors
+    of the reference population.
+
+    ### Example use:
+    ```python
+    ancestors_df = get_ancestor_contributions(ped_df, reference_ids, lbls)
+    fa = effective_number(ancestors_df["contribution"])
+    ```"""
+    if index is None:
+        index = PedigreeIndex.from_pedigree(pedigree, pedigree_labels)
+    reference = _reference_positions(index, reference_ids)
+    ancestors, sire, dam, levels = _ancestor_subgraph(index, reference)
+    is_founder = (sire == UnknownPosition) & (dam == UnknownPosition)
+    sire, dam, levels, origin, role = _with_phantom_parents(sire, dam, levels)
+    own = np.zeros(origin.size)
+    own[np.searchsorted(ancestors, reference)] = 1 / reference.size
+
+    # only founders & animals that are parents within the subgraph are ancestors
+    is_ancestor = np.zeros(origin.size, dtype=bool)
+    is_ancestor[np.flatnonzero(is_founder)] = True
+    for parent in (sire, dam):
+        is_ancestor[parent[parent != UnknownPosition]] = True
+
+    selected = np.zeros(origin.size, dtype=bool)
+    chosen, marginal = [], []
+    for _ in range(min(max_ancestors, origin.size)):
+        # chosen ancestors are treated as founders
+        cut_sire = np.where(selected, UnknownPosition, sire)
+        cut_dam = np.where(selected, UnknownPosition, dam)
+        contribution = _propagate_to_parents(own, cut_sire, cut_dam, levels)
+        explained = _propagate_from_parents(selected, cut_sire, cut_dam, levels)
+        contribution = np.where(
+            selected | ~is_ancestor, 0.0, contribution * (1 - explained)
+        )
+        best = np.argmax(contribution)
+        if contribution[best] <= 1e-12:
+            break
+        selected[best] = True
+        chosen.append(best)
+        marginal.append(contribution[best])
+
+    chosen = np.array(chosen, dtype=np.int64)
+    return pl.DataFrame(
+        {
+            pedigree_labels[0]: index.to_ids(ancestors[origin[chosen]]),
+            "parent": pl.Series([role[c] for c in chosen], dtype=pl.String),
+            "contribution": np.array(marginal, dtype=np.float64),
+        }
+    )
+
+
+def compute_genetic_conservation_index(
+    pedigree: pl.DataFrame | pl.LazyFrame,
+    pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    index: PedigreeIndex | None = None,
+    batch_size: int = 4096,
+) -> pl.DataFrame | pl.LazyFrame:
+    """Adds a `gci` column with the genetic conservation index of each animal
+
+    The GCI (Alderson, 1992) is the effective number of founders of an animal's own
+    pedigree, 1 / sum of squared founder contributions, with an unknown parent of
+    an ancestor counting as a separate founder. Contributions are found by tracing
+    the ancestors of `batch_size` animals at a time.
+
+    ### Example use:
+    ```python
+    gci_df = compute_genetic_conservation_index(ped_df, lbls)
+    ```"""
+    animal = pedigree_labels[0]
+    if index is None:
+        index = PedigreeIndex.from_pedigree(pedigree, pedigree_labels)
+    generation = index.generations()
+    unknown_parents = (index.sire == UnknownPosition).astype(np.int64) + (
+        index.dam == UnknownPosition
+    )
+    # squared contribution of each founder (or unknown parent) per unit coefficient
+    founder_weight = np.select(
+        [unknown_parents == 2, unknown_parents == 1], [1.0, 0.25]
+    )
+
+    queries = np.flatnonzero(index.has_record)
+    squares = np.zeros(queries.size)
+    for b in range(0, queries.size, batch_size):
+        batch = queries[b : b + batch_size]
+        paths = (np.arange(batch.size), batch, np.ones(batch.size))
+        for query, ancestor, coefficient in _trace_ancestors(
+            paths, index.sire, index.dam, generation
+        ):
+            squares[b : b + batch_size] += np.bincount(
+                query, founder_weight[ancestor] * coefficient**2, minlength=batch.size
+            )
+    gci = pl.DataFrame({animal: index.to_ids(queries), "gci": 1 / squares})
+    if isinstance(pedigree, pl.LazyFrame):
+        gci = gci.lazy()
+    return pedigree.join(gci, on=animal, how="left", maintain_order="left")
@@ -22,7 +22,7 @@ SexCodes = {
 
 def is_integer(df: pl.LazyFrame | pl.DataFrame, column) -> bool:
     """Determines if the specified column in the DataFrame has an integer type"""
-    return isinstance(df.schema[column], (pl.Int64, pl.Int32, pl.Int16))
+    return isinstance(df.collect_schema()[column], (pl.Int64, pl.Int32, pl.Int16))
 
 
 def get_unknown_parent_value(
@@ -111,3 +111,94 @@ def parents(parent_labels: tuple[str] = PedigreeLabels[1:]) -> pl.Expr:
     return pl.concat([known_unique(pl.col(pnt)) for pnt in parent_labels]).alias(
         "parent"
     )
+
+
+def assign_unknown_parent_groups(
+    pedigree: pl.LazyFrame | pl.DataFrame,
+    group_by: list[str | pl.Expr],
+    pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+) -> tuple[pl.LazyFrame | pl.DataFrame, pl.DataFrame]:
+    """Replaces unknown (null) sires & dams with unknown parent groups
+
+    Groups are defined by whether the missing parent is the sire or dam, and the
+    values of the `group_by` columns or expressions for the progeny (e.g. a period
+    of birth years & breed). Group Ids are negative integers (-1, -2, ...) if animal
+    Ids are integers, otherwise `'UPG1'`, `'UPG2'`, ... Unsigned (e.g. recoded) Ids,
+    or group Ids that are already in the pedigree, raise ValueError. Use
+    `null_unknown_parents` & `null_parents_without_own_record` first so all unknown
+    parents are null.
+
+    Returns the pedigree with groups as parents & the groups, with the group Id (in
+    the animal column), the `parent` column it replaces & the `group_by` values.
+
+    ### Example use:
+    ```python
+    ped_df, groups_df = assign_unknown_parent_groups(
+        ped_df, [(pl.col("birth_year") // 5 * 5).alias("period"), "breed"], lbls
+    )
+    recode_pedigree(ped_df, lbls, unknown_parent_groups=groups_df)
+    ```"""
+    animal, sire, dam = pedigree_labels
+    if (dtype := pedigree.collect_schema()[animal]).is_unsigned_integer():
+        raise ValueError(
+            f"Animal Ids are unsigned ({dtype}) so cannot hold negative group Ids; "
+            "cast them to a signed integer type or assign groups before recoding."
+        )
+    group_by = [pl.col(key) if isinstance(key, str) else key for key in group_by]
+    names = [key.meta.output_name() for key in group_by]
+    keys = [f"_group_{i}" for i in range(len(group_by))]
+    with_keys = pedigree.lazy().with_columns(
+        key.alias(name) for key, name in zip(group_by, keys)
+    )
+
+    groups = (
+        pl.concat(
+            with_keys.filter(pl.col(parent).is_null())
+            .select(pl.lit(parent).alias("parent"), *keys)
+            .unique()
+            .sort(keys, nulls_last=True)
+            for parent in (sire, dam)
+        )
+        .with_row_index("group", offset=1)
+        .collect()
+    )
+    if dtype.is_integer():
+        group_ids = (-pl.col("group").cast(pl.Int64)).cast(dtype)
+    else:
+        group_ids = pl.format("UPG{}", pl.col("group"))
+    groups = groups.select(group_ids.alias(animal), "parent", *keys)
+    clashes = (
+        pedigree.lazy()
+        .select(pedigree_ids(pedigree_labels).alias(animal))
+        .join(groups.lazy(), on=animal, how="semi")
+        .collect()
+    )
+    if clashes.height != 0:
+        raise ValueError(
+            f"{clashes.height} group Ids are already animal Ids in the pedigree: \n "
+            f"{clashes}"
+        )
+
+    for parent in (sire, dam):
+        with_keys = (
+            with_keys.join(
+                groups.lazy()
+                .filter(pl.col("parent") == parent)
+                .select(pl.col(animal).alias("_group"), *keys),
+                on=keys,
+                how="left",
+                nulls_equal=True,
+                maintain_order="left",
+            )
+            .with_columns(
+                pl.when(pl.col(parent).is_null())
+                .then(pl.col("_group"))
+                .otherwise(pl.col(parent))
+                .alias(parent)
+            )
+            .drop("_group")
+        )
+    with_keys = with_keys.drop(keys)
+    if isinstance(pedigree, pl.DataFrame):
+        with_keys = with_keys.collect()
+    return with_keys, groups.rename(dict(zip(keys, names)))
@@ -0,0 +1,79 @@
+import itertools
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+from pedpol.core import PedigreeLabels
+
+
+def _record_dtype(schema: pl.Schema) -> np.dtype:
+    """Returns the little-endian record layout of the columns written in binary"""
+    return np.dtype(
+        [(name, "<f4" if dtype.is_float() else "<i4") for name, dtype in schema.items()]
+    )
+
+
+def write_solver_pedigree(
+    pedigree: pl.DataFrame | pl.LazyFrame,
+    path: str | Path,
+    pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    columns: tuple[str, ...] = (),
+    binary: bool = False,
+    chunk_size: int = 2**20,
+    float_precision: int | None = None,
+) -> None:
+    """Writes a recoded pedigree for external solvers, with 0 for unknown parents
+
+    The animal, sire & dam columns, followed by any other `columns` (e.g. an
+    unknown parent group or `inbreeding`), are written without a header as space
+    separated text (as read by BLUPF90 programs), streamed in batches. If `binary`
+    is True, records are instead written as raw little-endian int32 (float32 for
+    float columns) in chunks of `chunk_size` rows, so they can be memory mapped.
+    Floats in text are written with `float_precision` decimals if given (slower),
+    otherwise as the shortest exact representation. Ids must be integers (see
+    `recode_pedigree`) & nulls are written as 0.
+
+    ### Example use:
+    ```python
+    recoded_df, id_map = recode_pedigree(ped_df, lbls)
+    recoded_df = compute_inbreeding(recoded_df, lbls)
+    write_solver_pedigree(recoded_df, "ped.bin", lbls, ("inbreeding",), binary=True)
+    dtype = [("animal", "<i4"), ("sire", "<i4"), ("dam", "<i4"), ("inbreeding", "<f4")]
+    np.memmap("ped.bin", dtype=dtype, mode="r")
+    ```"""
+    labels = [*pedigree_labels, *columns]
+    pedigree = pedigree.lazy().select(labels)
+    schema = pedigree.collect_schema()
+    if not all(schema[label].is_integer() for label in pedigree_labels):
+        dtypes = [str(schema[label]) for label in pedigree_labels]
+        raise ValueError(
+            f"Pedigree Ids must be integers to be written for solvers, not {dtypes}; "
+            "use `recode_pedigree` first."
+        )
+    pedigree = pedigree.with_columns(pl.all().fill_null(0))
+    if not binary:
+        pedigree.sink_csv(
+            path,
+            separator=" ",
+            include_header=False,
+            float_precision=float_precision,
+        )
+        return
+
+    dtype = _record_dtype(schema)
+    with open(path, "wb") as file:
+        # collect a slice at a time so only one chunk is in memory
+        for offset in itertools.count(0, chunk_size):
+            chunk = pedigree.slice(offset, chunk_size).collect()
+            if chunk.height == 0:
+                break
+            records = np.empty(chunk.height, dtype=dtype)
+            for name in dtype.names:
+                # strict casting raises if a value doesn't fit in 32 bits
+                records[name] = (
+                    chunk.get_column(name)
+                    .cast(pl.Float32 if dtype[name].kind == "f" else pl.Int32)
+                    .to_numpy()
+                )
+            records.tofile(file)
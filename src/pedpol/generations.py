@@ -1,16 +1,50 @@
 from typing import Collection
 
+import numpy as np
 import polars as pl
 
+from pedpol.cache import PedigreeCache, pedigree_fingerprint
 from pedpol.core import PedigreeLabels, parents
+from pedpol.index import (
+    PedigreeIndex,
+    UnknownPosition,
+    _check_acyclic,
+    _csr_gather,
+    _encode_pedigree,
+    _generation_heights,
+)
+from pedpol.profiling import Profiler, _collect, _timer
+
+
+def _records_of(
+    pedigree: pl.DataFrame | pl.LazyFrame,
+    index: PedigreeIndex,
+    positions,
+    pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    annotations: dict[str, pl.Series] | None = None,
+) -> pl.LazyFrame:
+    """Return records for the animals at the index positions specified
+
+    `annotations` are extra columns (aligned with `positions`) to add to records."""
+    animal = pedigree_labels[0]
+    ids = index.to_ids(positions).alias(animal).to_frame()
+    if annotations:
+        ids = ids.with_columns(**annotations)
+    return pedigree.lazy().join(ids.lazy(), on=animal)
 
 
 def get_progeny_of(
     pedigree: pl.DataFrame | pl.LazyFrame,
     ids: pl.Expr | Collection[any] | pl.Series,
     pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    index: PedigreeIndex | None = None,
 ) -> pl.LazyFrame:
-    """Return records for the progeny of the animals specified"""
+    """Return records for the progeny of the animals specified
+
+    If a `PedigreeIndex` of the pedigree is given, progeny are found in array space."""
+    if index is not None:
+        progeny = index.progeny_of(index.positions(ids))
+        return _records_of(pedigree, index, progeny, pedigree_labels)
     ids = pl.Series(values=ids, dtype=pedigree.collect_schema()[pedigree_labels[0]])
     return pedigree.lazy().filter(
         pl.any_horizontal(pl.col(pedigree_labels[1:]).is_in(ids))
@@ -21,8 +55,14 @@ def get_parents_of(
     pedigree: pl.DataFrame | pl.LazyFrame,
     ids: pl.Expr | Collection[any] | pl.Series,
     pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    index: PedigreeIndex | None = None,
 ) -> pl.LazyFrame:
-    """Return records for the parents of the animals specified"""
+    """Return records for the parents of the animals specified
+
+    If a `PedigreeIndex` of the pedigree is given, parents are found in array space."""
+    if index is not None:
+        prnts = index.parents_of(index.positions(ids))
+        return _records_of(pedigree, index, prnts, pedigree_labels)
     animal, sire, dam = pedigree_labels
     if isinstance(ids, list):
         ids = pl.LazyFrame(
@@ -40,18 +80,63 @@ def _get_relatives_of(
     generations: int = 100,
     include_ids: bool = True,
     pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    index: PedigreeIndex | None = None,
+    depth_label: str | None = None,
+    paths_label: str | None = None,
+    profiler: Profiler | None = None,
 ) -> pl.DataFrame | pl.LazyFrame:
-    """General utility for iterating through pedigree to find relatives"""
+    """General utility for iterating through pedigree to find relatives
+
+    If a `profiler` is given, each generation of relatives found is recorded."""
     animal = pedigree_labels[0]
+    is_ancestors = relatives_function is get_parents_of
+    stage = "get_ancestors_of" if is_ancestors else "get_descendants_of"
+    if index is None and (depth_label or paths_label):
+        with _timer(profiler, stage, "build index"):
+            index = PedigreeIndex.from_pedigree(pedigree, pedigree_labels)
+    if index is not None:
+        annotations = {}
+        lap = None if profiler is None else profiler.laps(stage, "index generation")
+        with _timer(profiler, stage, "index traversal"):
+            if depth_label or paths_label:
+                relatives, depth, paths = (
+                    index.annotated_ancestors_of
+                    if is_ancestors
+                    else index.annotated_descendants_of
+                )(
+                    index.positions(ids),
+                    generations,
+                    include_ids,
+                    bool(paths_label),
+                    lap,
+                )
+                if depth_label:
+                    annotations[depth_label] = pl.Series(depth, dtype=pl.Int32)
+                if paths_label:
+                    annotations[paths_label] = pl.Series(paths, dtype=pl.Int64)
+            else:
+                relatives = (
+                    index.ancestors_of if is_ancestors else index.descendants_of
+                )(index.positions(ids), generations, include_ids, lap)
+        ids_relatives = _records_of(
+            pedigree, index, relatives, pedigree_labels, annotations
+        )
+        return (
+            ids_relatives
+            if isinstance(pedigree, pl.LazyFrame)
+            else ids_relatives.collect()
+        )
     ids = pl.DataFrame({animal: ids}, schema=pedigree.select(animal).collect_schema())
     g = 0
     ids_g = ids
     relatives = []
     while generations > g and ids_g.height != 0:
-        ids_g = (
-            relatives_function(pedigree, ids_g, pedigree_labels)
-            .select(animal)
-            .collect()
+        ids_g = _collect(
+            profiler,
+            stage,
+            "generation",
+            relatives_function(pedigree, ids_g, pedigree_labels).select(animal),
+            iteration=g,
         )
         relatives.append(ids_g)
         g += 1
@@ -70,8 +155,25 @@ def get_descendants_of(
     generations: int = 100,
     include_ids: bool = True,
     pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    index: PedigreeIndex | None = None,
+    depth_label: str | None = None,
+    paths_label: str | None = None,
+    profiler: Profiler | None = None,
 ) -> pl.DataFrame | pl.LazyFrame:
-    """Return the descendants of the animals specified"""
+    """Return the descendants of the animals specified
+
+    If a `PedigreeIndex` of the pedigree is given, the pedigree is traversed in
+    array space rather than by joining the pedigree once per generation.
+
+    If `depth_label` is given, a column with that name holds the minimum number of
+    generations between the animals specified & each descendant. If `paths_label` is
+    given, a column with that name holds the number of distinct paths reaching
+    each descendant within `generations` (raising ValueError if beyond the Int64
+    range). Both are found in the same traversal (building a `PedigreeIndex` if
+    needed).
+
+    A `profiler` (see `pedpol.profiling.Profiler`) records the time taken to find
+    each generation of relatives."""
     return _get_relatives_of(
         pedigree,
         ids,
@@ -79,6 +181,10 @@ def get_descendants_of(
         generations=generations,
         include_ids=include_ids,
         pedigree_labels=pedigree_labels,
+        index=index,
+        depth_label=depth_label,
+        paths_label=paths_label,
+        profiler=profiler,
     )
 
 
@@ -88,8 +194,25 @@ def get_ancestors_of(
     generations: int = 100,
     include_ids: bool = True,
     pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    index: PedigreeIndex | None = None,
+    depth_label: str | None = None,
+    paths_label: str | None = None,
+    profiler: Profiler | None = None,
 ) -> pl.DataFrame | pl.LazyFrame:
-    """Return the descendants of the animals specified"""
+    """Return the ancestors of the animals specified
+
+    If a `PedigreeIndex` of the pedigree is given, the pedigree is traversed in
+    array space rather than by joining the pedigree once per generation.
+
+    If `depth_label` is given, a column with that name holds the minimum number of
+    generations between the animals specified & each ancestor. If `paths_label` is
+    given, a column with that name holds the number of distinct paths reaching
+    each ancestor within `generations` (raising ValueError if beyond the Int64
+    range). Both are found in the same traversal (building a `PedigreeIndex` if
+    needed).
+
+    A `profiler` (see `pedpol.profiling.Profiler`) records the time taken to find
+    each generation of relatives."""
     return _get_relatives_of(
         pedigree,
         ids,
@@ -97,39 +220,408 @@ def get_ancestors_of(
         generations=generations,
         include_ids=include_ids,
         pedigree_labels=pedigree_labels,
+        index=index,
+        depth_label=depth_label,
+        paths_label=paths_label,
+        profiler=profiler,
+    )
+
+
+def _get_relatives_of_queries(
+    pedigree: pl.DataFrame | pl.LazyFrame,
+    queries: pl.DataFrame | pl.LazyFrame,
+    relatives: str,
+    generations: int = 100,
+    include_ids: bool = True,
+    pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    query_label: str = "query_id",
+    index: PedigreeIndex | None = None,
+) -> pl.DataFrame:
+    """General utility for finding relatives of many queries in one traversal"""
+    animal = pedigree_labels[0]
+    if index is None:
+        index = PedigreeIndex.from_pedigree(pedigree, pedigree_labels)
+    queries = (
+        queries.lazy()
+        .select(query_label, animal)
+        .with_columns(pl.col(query_label).rank("dense").alias("_query") - 1)
+        .collect()
+    )
+    query_ids = queries.select(query_label, "_query").unique().sort("_query")
+    positions = index.lookup(queries.get_column(animal))
+    in_index = positions != UnknownPosition
+    found_query, found = getattr(index, f"{relatives}_of_queries")(
+        queries.get_column("_query").to_numpy()[in_index],
+        positions[in_index],
+        generations,
+        include_ids,
+    )
+    return pl.DataFrame(
+        {
+            query_label: query_ids.get_column(query_label).gather(found_query),
+            "relative": index.to_ids(found),
+        }
+    )
+
+
+def get_ancestors_of_queries(
+    pedigree: pl.DataFrame | pl.LazyFrame,
+    queries: pl.DataFrame | pl.LazyFrame,
+    generations: int = 100,
+    include_ids: bool = True,
+    pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    query_label: str = "query_id",
+    index: PedigreeIndex | None = None,
+) -> pl.DataFrame:
+    """Return the ancestors of each of many separate groups of animals
+
+    `queries` has a `query_label` column identifying each group & an animal column
+    (named as in `pedigree_labels`). All groups are traversed together in one
+    pass, returning (`query_label`, `relative`) rows. Relatives that are parents
+    without their own record are included.
+
+    ### Example use:
+    ```python
+    teams = pl.DataFrame({"query_id": ["A", "A", "B"], "Child": ["Barry", "Emily", "Harry"]})
+    get_ancestors_of_queries(ped_df, teams, pedigree_labels=("Child", "Father", "Mother"))
+    ```"""
+    return _get_relatives_of_queries(
+        pedigree,
+        queries,
+        "ancestors",
+        generations=generations,
+        include_ids=include_ids,
+        pedigree_labels=pedigree_labels,
+        query_label=query_label,
+        index=index,
+    )
+
+
+def get_descendants_of_queries(
+    pedigree: pl.DataFrame | pl.LazyFrame,
+    queries: pl.DataFrame | pl.LazyFrame,
+    generations: int = 100,
+    include_ids: bool = True,
+    pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    query_label: str = "query_id",
+    index: PedigreeIndex | None = None,
+) -> pl.DataFrame:
+    """Return the descendants of each of many separate groups of animals
+
+    See `get_ancestors_of_queries`."""
+    return _get_relatives_of_queries(
+        pedigree,
+        queries,
+        "descendants",
+        generations=generations,
+        include_ids=include_ids,
+        pedigree_labels=pedigree_labels,
+        query_label=query_label,
+        index=index,
     )
 
 
 def classify_generations(
     pedigree: pl.DataFrame | pl.LazyFrame,
     pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    profiler: Profiler | None = None,
+    cache: PedigreeCache | None = None,
 ) -> pl.DataFrame:
     """Add column classifying the animals into generations within the pedigree
 
+    Animals are peeled from the pedigree youngest first (Kahn's algorithm over
+    integer positions), so the cost is linear in the size of the pedigree rather
+    than proportional to its depth. Raises a ValueError naming the animals in the
+    cycle if the pedigree is circular. If a `profiler` is given, encoding & each
+    round of peeling are recorded. If a `cache` is given, generations are reused
+    whenever the same pedigree is classified again.
+
     Journal of Animal and Veterinary Advances
     Year: 2009 | Volume: 8 | Issue: 1 | Page No.: 177-182
     An Algorithm to Sort Complex Pedigrees Chronologically without Birthdates
     Zhiwu Zhang , Changxi Li , Rory J. Todhunter , George Lust , Laksiri Goonewardene and Zhiquan Wang"""
+    stage = "classify_generations"
+    if cache is not None:
+        pedigree = pedigree.lazy().collect()
+        generation = cache.get_or_compute(
+            "generations",
+            pedigree_fingerprint(pedigree, pedigree_labels),
+            lambda: classify_generations(pedigree, pedigree_labels, profiler).select(
+                "generation"
+            ),
+        )
+        return pedigree.with_columns(generation.to_series())
+    with _timer(profiler, stage, "encode"):
+        pedigree = pedigree.lazy().collect()
+        ids, animals, sires, dams = _encode_pedigree(pedigree, pedigree_labels)
+    lap = None if profiler is None else profiler.laps(stage, "peel")
+    heights, in_cycle = _generation_heights(ids.len(), animals, sires, dams, lap)
+    _check_acyclic(ids, in_cycle)
+
+    heights = heights[animals]
+    return pedigree.with_columns(
+        pl.Series("generation", heights.max(initial=0) - heights, dtype=pl.Int32)
+    )  # reverse generation order (0 is earliest/oldest)
+
+
+def prune_pedigree(
+    pedigree: pl.DataFrame | pl.LazyFrame,
+    keep_ids: pl.Expr | Collection[any] | pl.Series,
+    pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    index: PedigreeIndex | None = None,
+) -> pl.DataFrame | pl.LazyFrame:
+    """Returns the pedigree of the animals specified, without uninformative founders
+
+    The pedigree is reduced to `keep_ids` (e.g. animals with phenotypes) & all of
+    their ancestors, then founders that are not in `keep_ids` & have only one
+    progeny are removed (their progeny's parent becomes null), repeating until
+    none are left. This is done in index space, so each round is one pass over
+    the arrays. Remaining parents without their own record are given one (as by
+    `add_missing_records`), so the result is ready for `recode_pedigree`.
+
+    ### Example use:
+    ```python
+    phenotyped = records_df.get_column("Child").unique()
+    pruned_df = prune_pedigree(ped_df, phenotyped, ("Child", "Father", "Mother"))
+    ```"""
     animal, sire, dam = pedigree_labels
-    g = 0
-    parents_df = pedigree = (
-        pedigree.with_columns(pl.lit(g).alias("generation")).lazy().collect()
+    if index is None:
+        index = PedigreeIndex.from_pedigree(pedigree, pedigree_labels)
+    keep = np.zeros(len(index), dtype=bool)
+    keep[index.positions(keep_ids)] = True
+    kept = np.zeros(len(index), dtype=bool)
+    kept[index.ancestors_of(np.flatnonzero(keep), generations=len(index))] = True
+
+    # sire & dam of each position, with parents that are no longer kept unknown
+    parents = np.stack([index.sire, index.dam])
+    while True:
+        known = parents != UnknownPosition
+        known[known] = kept[parents[known]]
+        progeny = np.bincount(parents[known & kept], minlength=len(index))
+        removed = kept & ~keep & ~known.any(axis=0) & (progeny <= 1)
+        if not removed.any():
+            break
+        kept &= ~removed
+
+    kept_ids = pl.LazyFrame({"_kept_id": index.to_ids(np.flatnonzero(kept))})
+    missing_ids = index.to_ids(np.flatnonzero(kept & ~index.has_record))
+    schema = pedigree.collect_schema()
+    missing = pl.LazyFrame({animal: missing_ids}, schema={animal: schema[animal]})
+    records = pedigree.lazy().join(
+        kept_ids.select(pl.col("_kept_id").cast(schema[animal]).alias(animal)),
+        on=animal,
+        how="semi",
+        maintain_order="left",
     )
-    parent_count = parents_df.height + 1
-    while parents_df.height < parent_count:
-        parent_count = parents_df.height
-        pedigree = pedigree.with_columns(
-            pl.when(
-                pl.col(animal).is_in(
-                    parents_df.select(parents((sire, dam))).to_series()
+    for parent in (sire, dam):
+        records = (
+            records.join(
+                kept_ids.select(
+                    pl.col("_kept_id").cast(schema[parent]).alias(parent),
+                    pl.lit(True).alias("_kept"),
+                ),
+                on=parent,
+                how="left",
+                maintain_order="left",
+            )
+            .with_columns(pl.when(pl.col("_kept")).then(pl.col(parent)).alias(parent))
+            .drop("_kept")
+        )
+    pruned = pl.concat(
+        [
+            missing.with_columns(
+                pl.lit(None).cast(dtype).alias(col)
+                for col, dtype in schema.items()
+                if col != animal
+            ).select(schema.names()),
+            records,
+        ]
+    )
+    return pruned if isinstance(pedigree, pl.LazyFrame) else pruned.collect()
+
+
+def _exact_descendant_counts(index: PedigreeIndex) -> np.ndarray:
+    """Returns the number of distinct descendants of each position
+
+    Each parent's set of descendants is merged from its progeny & their sets a
+    generation at a time, youngest first. Sets are held (as CSR arrays per
+    generation) only for parents & only until all their own parents are merged."""
+    progeny_counts = np.diff(index.progeny_offsets)
+    generation = index.generations()
+    counts = np.zeros(len(index), dtype=np.int64)
+    # the generation (& row within it) holding the descendant set of each parent
+    set_generation = np.full(len(index), -1, dtype=np.int64)
+    set_row = np.zeros(len(index), dtype=np.int64)
+    sets = {}  # generation -> (offsets, descendants, generation last needed)
+    for g, level in reversed(list(enumerate(index.levels()))):
+        level = level[progeny_counts[level] > 0]
+        if level.size != 0:
+            progeny = _csr_gather(index.progeny_offsets, index.progeny, level)
+            rows = np.repeat(np.arange(level.size), progeny_counts[level])
+            values, value_rows = [progeny], [rows]
+            has_set = set_generation[progeny] != -1
+            for set_g in np.unique(set_generation[progeny[has_set]]):
+                offsets, descendants, _ = sets[set_g]
+                from_g = has_set & (set_generation[progeny] == set_g)
+                set_rows = set_row[progeny[from_g]]
+                values.append(_csr_gather(offsets, descendants, set_rows))
+                value_rows.append(
+                    np.repeat(rows[from_g], offsets[set_rows + 1] - offsets[set_rows])
                 )
+
+            # sorting (row, descendant) keys gives the distinct descendants of each
+            keys = np.concatenate(value_rows) * len(index) + np.concatenate(values)
+            keys = np.sort(keys)
+            keys = keys[np.r_[True, keys[1:] != keys[:-1]]]
+            set_counts = np.bincount(keys // len(index), minlength=level.size)
+            counts[level] = set_counts
+            set_generation[level], set_row[level] = g, np.arange(level.size)
+            sires, dams = index.sire[level], index.dam[level]
+            parent_generations = np.concatenate(
+                [generation[p[p != UnknownPosition]] for p in (sires, dams)]
+            )
+            sets[g] = (
+                np.r_[0, np.cumsum(set_counts)],
+                keys % len(index),
+                parent_generations.min(initial=g),
             )
-            .then(pl.col("generation") + 1)
-            .otherwise("generation")
+        # sets are no longer needed once the oldest of their parents is merged
+        for set_g in [k for k, (*_, last) in sets.items() if last >= g]:
+            del sets[set_g]
+    return counts
+
+
+def _sketched_descendant_counts(
+    index: PedigreeIndex, sketch_size: int, seed: int = 0
+) -> np.ndarray:
+    """Returns estimates of the number of distinct descendants of each position
+
+    Each animal holds a K-minimum-values sketch (the `sketch_size` smallest hashes)
+    of its descendants, merged from those of its progeny a generation at a time,
+    youngest first. Hashes are a random permutation of positions, so they never
+    collide & counts are exact while fewer than `sketch_size` descendants."""
+    empty = np.iinfo(np.uint32).max
+    if len(index) >= empty:
+        raise ValueError(f"Sketches need fewer than {empty} animals in the pedigree.")
+    hashes = np.random.default_rng(seed).permutation(len(index)).astype(np.uint32)
+    # only parents have descendants, so only they are given a sketch (row)
+    progeny_counts = np.diff(index.progeny_offsets)
+    row = np.cumsum(progeny_counts > 0) - 1
+    sketch = np.full(
+        (row[-1] + 1 if row.size else 0, sketch_size), empty, dtype=np.uint32
+    )
+    for level in reversed(index.levels()):
+        counts = progeny_counts[level]
+        level = level[counts > 0]
+        if level.size == 0:
+            continue
+        progeny = _csr_gather(index.progeny_offsets, index.progeny, level)
+        parent = np.repeat(row[level], counts[counts > 0])
+        # the hashes of all progeny, & the sketches of those that are parents
+        is_parent = progeny_counts[progeny] > 0
+        values = np.concatenate(
+            [hashes[progeny], sketch[row[progeny[is_parent]]].ravel()]
         )
-        parents_df = pedigree.filter(pl.col("generation") > g)
-        g += 1
+        parent = np.concatenate([parent, np.repeat(parent[is_parent], sketch_size)])
 
-    return pedigree.with_columns(
-        (pl.col("generation").max() - pl.col("generation")).alias("generation")
-    )  # reverse generation order (0 is earliest/oldest)
+        # sorting (parent, hash) keys gives the smallest distinct hashes of each parent
+        keys = (parent.astype(np.int64) << 32) | values
+        keys = np.sort(keys[values != empty])
+        keys = keys[np.r_[True, keys[1:] != keys[:-1]]]
+        parent, values = keys >> 32, keys & empty
+        starts = np.flatnonzero(np.r_[True, parent[1:] != parent[:-1]])
+        rank = np.arange(keys.size) - np.repeat(
+            starts, np.diff(np.r_[starts, keys.size])
+        )
+        smallest = rank < sketch_size
+        sketch[parent[smallest], rank[smallest]] = values[smallest]
+
+    held = (sketch != empty).sum(axis=1)
+    # the k-th smallest of distinct hashes sampled from 0..n-1
+    kth = (sketch[:, -1].astype(np.float64) + 1) / len(index)
+    estimate = np.where(held < sketch_size, held, np.round((sketch_size - 1) / kth))
+    return np.where(progeny_counts > 0, estimate[row], 0).astype(np.int64)
+
+
+def count_relatives(
+    pedigree: pl.DataFrame | pl.LazyFrame,
+    pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    sketch_size: int | None = None,
+    index: PedigreeIndex | None = None,
+) -> pl.DataFrame | pl.LazyFrame:
+    """Adds columns counting the progeny & descendants of each animal
+
+     * `n_progeny_as_sire` & `n_progeny_as_dam`: progeny with the animal as that parent
+     * `n_progeny`: distinct progeny
+     * `n_grand_progeny`: distinct progeny of progeny
+     * `n_descendants`: distinct descendants over all generations
+
+    Progeny & grand-progeny are counted with `group_by`s over the records.
+    Descendants are counted in a single pass over the generations, youngest first,
+    merging the descendants of progeny into their parents. Exact counts hold the
+    set of descendants of each parent until its own parents are merged, so memory
+    grows with the number of descendants of a generation of parents. If
+    `sketch_size` is given, descendants are instead estimated with
+    K-minimum-values sketches (relative error about 1/sqrt(`sketch_size`), exact
+    for animals with fewer descendants), which take 4 x `sketch_size` bytes per
+    parent, e.g. 1 GB for 1M parents & a `sketch_size` of 256.
+
+    ### Example use:
+    ```python
+    counts_df = count_relatives(ped_df, lbls, sketch_size=256)
+    counts_df.sort("n_descendants", descending=True).head(20)
+    ```"""
+    animal, sire, dam = pedigree_labels
+    if index is None:
+        index = PedigreeIndex.from_pedigree(pedigree, pedigree_labels)
+    records = pedigree.lazy().select(animal, sire, dam).unique(animal, keep="first")
+    pairs = pl.concat(
+        records.select(
+            pl.col(animal).alias("_progeny"),
+            pl.col(parent).alias("_parent"),
+            pl.lit(parent).alias("role"),
+        )
+        for parent in (sire, dam)
+    ).drop_nulls("_parent")
+    grand_pairs = pairs.join(
+        pairs.select(
+            pl.col("_progeny").alias("_grandparent"), pl.col("_parent").alias("_id")
+        ),
+        left_on="_parent",
+        right_on="_grandparent",
+    )
+    counts = [
+        pairs.group_by(pl.col("_parent").alias("_id")).agg(
+            *[
+                (pl.col("role") == parent).sum().alias(f"n_progeny_as_{role}")
+                for parent, role in ((sire, "sire"), (dam, "dam"))
+            ],
+            pl.col("_progeny").n_unique().alias("n_progeny"),
+        ),
+        grand_pairs.group_by("_id").agg(
+            pl.col("_progeny").n_unique().alias("n_grand_progeny")
+        ),
+    ]
+    if sketch_size is None:
+        descendants = _exact_descendant_counts(index)
+    else:
+        descendants = _sketched_descendant_counts(index, sketch_size)
+    relatives = pl.LazyFrame({"_id": index.ids, "n_descendants": descendants})
+    for count in counts:
+        relatives = relatives.join(count, on="_id", how="left", maintain_order="left")
+    relatives = (
+        relatives.filter(pl.Series(index.has_record))
+        .select(
+            pl.col("_id").alias(animal),
+            pl.col(
+                "n_progeny_as_sire", "n_progeny_as_dam", "n_progeny", "n_grand_progeny"
+            )
+            .fill_null(0)
+            .cast(pl.Int64),
+            "n_descendants",
+        )
+        .collect()
+    )
+    if isinstance(pedigree, pl.LazyFrame):
+        relatives = relatives.lazy()
+    return pedigree.join(relatives, on=animal, how="left", maintain_order="left")
@@ -0,0 +1,648 @@
+from collections.abc import Callable, Collection
+
+import numpy as np
+import polars as pl
+
+from pedpol.cache import PedigreeCache, pedigree_fingerprint
+from pedpol.core import PedigreeLabels
+
+UnknownPosition = -1
+"""Position used in parent arrays to represent an unknown parent"""
+
+
+def _position_dtype(size: int) -> np.dtype:
+    """Returns the narrowest signed integer type able to hold positions up to `size`"""
+    return np.dtype(np.int32) if size < np.iinfo(np.int32).max else np.dtype(np.int64)
+
+
+def _csr_gather(
+    offsets: np.ndarray, values: np.ndarray, rows: np.ndarray
+) -> np.ndarray:
+    """Returns the concatenated CSR `values` for each of `rows`
+
+    Cost is proportional to the number of values returned, not the size of the arrays."""
+    starts = offsets[rows]
+    counts = offsets[rows + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        return values[:0]
+    shift = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return values[shift + np.arange(total, dtype=shift.dtype)]
+
+
+def _encode_pedigree(
+    pedigree: pl.DataFrame | pl.LazyFrame,
+    pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+) -> tuple[pl.Series, np.ndarray, np.ndarray, np.ndarray]:
+    """Encodes the Ids of a pedigree as dense integer positions
+
+    Returns the Ids in position order (animals with own record first, in record
+    order, then parents without their own record) and the animal, sire & dam
+    positions of every record. Unknown parents have position `UnknownPosition`."""
+    animal, sire, dam = pedigree_labels
+    records = pedigree.lazy().select(animal, sire, dam).collect()
+    ids = (
+        pl.concat([records.get_column(label) for label in pedigree_labels])
+        .drop_nulls()
+        .unique(maintain_order=True)
+        .alias(animal)
+    )
+    dtype = _position_dtype(ids.len())
+    positions = records.select(
+        [
+            pl.col(label)
+            .replace_strict(ids, pl.int_range(ids.len(), eager=True), default=None)
+            .fill_null(UnknownPosition)
+            for label in pedigree_labels
+        ]
+    )
+    return ids, *(
+        positions.get_column(lbl).to_numpy().astype(dtype) for lbl in pedigree_labels
+    )
+
+
+def _kahn_levels(
+    size: int,
+    sources: np.ndarray,
+    targets: np.ndarray,
+    lap: Callable[[int], None] | None = None,
+) -> np.ndarray:
+    """Peels nodes with no remaining incoming edges, one level at a time
+
+    Edges run from `sources` to `targets`. Returns the level at which each node was
+    peeled (0 for nodes without incoming edges), or -1 for nodes that can never be
+    peeled because they are in, or downstream of, a cycle. Every edge is visited
+    once, so cost is linear in the size of the graph. If given, `lap` is called
+    with the number of nodes peeled after each level (see `Profiler.laps`)."""
+    levels = np.full(size, -1, dtype=np.int64)
+    if size == 0:
+        return levels
+    remaining = np.bincount(targets, minlength=size)
+    order = np.argsort(sources, kind="stable")
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=size), out=offsets[1:])
+    targets = targets[order]
+
+    frontier = np.flatnonzero(remaining == 0)
+    level = 0
+    while frontier.size != 0:
+        levels[frontier] = level
+        released, counts = np.unique(
+            _csr_gather(offsets, targets, frontier), return_counts=True
+        )
+        remaining[released] -= counts
+        if lap is not None:
+            lap(frontier.size)
+        frontier = released[remaining[released] == 0]
+        level += 1
+    return levels
+
+
+def _generation_heights(
+    size: int,
+    animals: np.ndarray,
+    sires: np.ndarray,
+    dams: np.ndarray,
+    lap: Callable[[int], None] | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the height of each position & the positions that are in cycles
+
+    The height of an animal is the length of the longest line of descent below it
+    (0 for animals without progeny). Positions upstream of a cycle have no height
+    (-1), while the positions returned as in cycles are those that can be reached
+    from, and reach, a cycle. Animals that are their own parent are ignored here,
+    they are found by `get_animals_are_own_parent`. `lap` is passed to
+    `_kahn_levels` to time each round of peeling."""
+    parents = np.concatenate([sires, dams])
+    children = np.concatenate([animals, animals])
+    known = (parents != UnknownPosition) & (parents != children)
+    parents, children = parents[known], children[known]
+
+    heights = _kahn_levels(size, children, parents, lap)
+    stuck = heights == -1
+    if not stuck.any():
+        return heights, np.zeros(0, dtype=animals.dtype)
+    in_stuck = stuck[parents] & stuck[children]
+    depths = _kahn_levels(size, parents[in_stuck], children[in_stuck])
+    return heights, np.flatnonzero(stuck & (depths == -1)).astype(animals.dtype)
+
+
+def _check_acyclic(ids: pl.Series, in_cycle: np.ndarray) -> None:
+    """Raises a ValueError naming the animals in a cycle, if there are any"""
+    if in_cycle.size != 0:
+        raise ValueError(
+            f"Pedigree is circular, animals {ids.gather(in_cycle).to_list()} are their own ancestors."
+        )
+
+
+def _tarjan_components(size: int, offsets: list[int], targets: list[int]) -> np.ndarray:
+    """Labels the strongly connected components of a graph held as CSR lists
+
+    Iterative form of Tarjan's algorithm. Returns the component of each node, or
+    -1 for nodes that are not in a cycle (i.e. singleton components)."""
+    order = [-1] * size
+    low = [0] * size
+    on_stack = [False] * size
+    components = [-1] * size
+    stack = []
+    counter = component = 0
+    for root in range(size):
+        if order[root] != -1:
+            continue
+        order[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [[root, offsets[root]]]
+        while work:
+            v, i = work[-1]
+            if i < offsets[v + 1]:
+                work[-1][1] += 1
+                w = targets[i]
+                if order[w] == -1:
+                    order[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append([w, offsets[w]])
+                elif on_stack[w]:
+                    low[v] = min(low[v], order[w])
+                continue
+
+            work.pop()
+            if work:
+                u = work[-1][0]
+                low[u] = min(low[u], low[v])
+            if low[v] == order[v]:
+                members = []
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    members.append(w)
+                    if w == v:
+                        break
+                if len(members) > 1:
+                    for w in members:
+                        components[w] = component
+                    component += 1
+    return np.array(components, dtype=np.int64)
+
+
+def _circular_components(
+    size: int, animals: np.ndarray, sires: np.ndarray, dams: np.ndarray
+) -> np.ndarray:
+    """Returns the cycle each position is in, or -1 for positions not in a cycle
+
+    The acyclic bulk of the pedigree is first peeled away in linear time, so
+    Tarjan's algorithm only runs over the (usually tiny) remainder."""
+    components = np.full(size, -1, dtype=np.int64)
+    candidates = _generation_heights(size, animals, sires, dams)[1]
+    if candidates.size == 0:
+        return components
+
+    compact = np.full(size, -1, dtype=np.int64)
+    compact[candidates] = np.arange(candidates.size)
+    parents = compact[np.concatenate([sires, dams])]
+    children = compact[np.concatenate([animals, animals])]
+    keep = (parents != -1) & (children != -1) & (parents != children)
+    parents, children = parents[keep], children[keep]
+    order = np.argsort(parents, kind="stable")
+    offsets = np.zeros(candidates.size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(parents, minlength=candidates.size), out=offsets[1:])
+
+    components[candidates] = _tarjan_components(
+        candidates.size, offsets.tolist(), children[order].tolist()
+    )
+    return components
+
+
+def _is_in_sorted(keys: np.ndarray, sorted_keys: np.ndarray) -> np.ndarray:
+    """Returns whether each of `keys` is in the sorted array `sorted_keys`"""
+    if sorted_keys.size == 0:
+        return np.zeros(keys.size, dtype=bool)
+    found = np.searchsorted(sorted_keys, keys).clip(max=sorted_keys.size - 1)
+    return sorted_keys[found] == keys
+
+
+class _SortedRuns:
+    """Set of integer keys held as sorted runs, merged like a binary counter
+
+    Adding keys costs about their number times the log of the size of the set,
+    rather than re-sorting every key already held."""
+
+    def __init__(self):
+        self.runs = []
+
+    def add_new(self, keys: np.ndarray) -> np.ndarray:
+        """Adds sorted, unique `keys`, returning those not already in the set"""
+        for run in self.runs:
+            keys = keys[~_is_in_sorted(keys, run)]
+        if keys.size != 0:
+            self.runs.append(keys)
+        # merge runs of similar sizes, so there are at most log2(size) runs
+        while len(self.runs) > 1 and self.runs[-2].size <= 2 * self.runs[-1].size:
+            last = self.runs.pop()
+            # a stable sort merges the two sorted runs in linear time
+            self.runs[-1] = np.sort(
+                np.concatenate([self.runs[-1], last]), kind="stable"
+            )
+        return keys
+
+
+class PedigreeIndex:
+    """Array-backed index of a pedigree for traversing relationships
+
+    Animals (and parents without their own record) are given dense integer
+    positions. Parents are held as position arrays & progeny as a CSR adjacency, so
+    relatives can be found in time proportional to the number of relatives rather
+    than the size of the pedigree. Animals with multiple records are indexed by
+    their first record. The progeny arrays, sort order of the Ids & generations
+    are built unless given, e.g. when opened from a `PedigreeStore`.
+
+    ### Example use:
+    ```python
+    index = PedigreeIndex.from_pedigree(ped_df, ("Child", "Father", "Mother"))
+    get_ancestors_of(ped_df, ["Kristi"], pedigree_labels=lbls, index=index)
+    ```"""
+
+    def __init__(
+        self,
+        ids: pl.Series,
+        sire: np.ndarray,
+        dam: np.ndarray,
+        has_record: np.ndarray,
+        pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+        progeny: tuple[np.ndarray, np.ndarray] | None = None,
+        sort_order: np.ndarray | None = None,
+        generations: np.ndarray | None = None,
+    ):
+        self.ids = ids
+        self.sire = sire
+        self.dam = dam
+        self.has_record = has_record
+        self.pedigree_labels = tuple(pedigree_labels)
+        if progeny is None:
+            progeny = self._build_progeny()
+        self.progeny_offsets, self.progeny = progeny
+        if sort_order is None:
+            sort_order = ids.arg_sort().to_numpy().astype(sire.dtype)
+        self._sort_order = sort_order
+        self._sorted_ids = ids.gather(self._sort_order)
+        self._generations = generations
+
+    @classmethod
+    def from_pedigree(
+        cls,
+        pedigree: pl.DataFrame | pl.LazyFrame,
+        pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+        cache: PedigreeCache | None = None,
+    ) -> "PedigreeIndex":
+        """Builds the index from a pedigree with unknown parents as `null`
+
+        If a `cache` is given, the index is reused whenever it is built again for
+        the same pedigree."""
+        if cache is not None:
+            pedigree = pedigree.lazy().collect()
+            return cache.get_or_compute(
+                "index",
+                pedigree_fingerprint(pedigree, pedigree_labels),
+                lambda: cls.from_pedigree(pedigree, pedigree_labels),
+                to_frame=cls.to_frame,
+                from_frame=lambda frame: cls.from_frame(frame, pedigree_labels),
+            )
+        ids, animals, sires, dams = _encode_pedigree(pedigree, pedigree_labels)
+        first = np.unique(animals, return_index=True)[1]
+        animals, sires, dams = animals[first], sires[first], dams[first]
+
+        sire = np.full(ids.len(), UnknownPosition, dtype=animals.dtype)
+        dam = np.full(ids.len(), UnknownPosition, dtype=animals.dtype)
+        has_record = np.zeros(ids.len(), dtype=bool)
+        sire[animals], dam[animals], has_record[animals] = sires, dams, True
+        return cls(ids, sire, dam, has_record, pedigree_labels)
+
+    @classmethod
+    def from_frame(
+        cls,
+        frame: pl.DataFrame,
+        pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    ) -> "PedigreeIndex":
+        """Rebuilds an index from the frame returned by `to_frame`"""
+        return cls(
+            frame.get_column("id"),
+            frame.get_column("sire").to_numpy(),
+            frame.get_column("dam").to_numpy(),
+            frame.get_column("has_record").to_numpy(),
+            pedigree_labels,
+        )
+
+    def to_frame(self) -> pl.DataFrame:
+        """Returns the ids, parent positions & record flags of the index positions"""
+        return pl.DataFrame(
+            {
+                "id": self.ids,
+                "sire": self.sire,
+                "dam": self.dam,
+                "has_record": self.has_record,
+            }
+        )
+
+    def __len__(self) -> int:
+        return self.ids.len()
+
+    def _build_progeny(self) -> tuple[np.ndarray, np.ndarray]:
+        """Builds CSR arrays listing the progeny of each position"""
+        children = np.arange(len(self), dtype=self.sire.dtype)
+        parents = np.concatenate([self.sire, self.dam])
+        children = np.concatenate([children, children])
+        known = parents != UnknownPosition
+        parents, children = parents[known], children[known]
+        order = np.argsort(parents, kind="stable")
+        offsets = np.zeros(len(self) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(parents, minlength=len(self)), out=offsets[1:])
+        return offsets, children[order]
+
+    def generations(self) -> np.ndarray:
+        """Returns the generation of each position (0 is earliest/oldest)
+
+        Parents are always in an earlier generation than their progeny. Raises a
+        ValueError if the pedigree is circular or any animal is its own parent."""
+        if self._generations is None:
+            positions = np.arange(len(self), dtype=self.sire.dtype)
+            own_parent = (self.sire == positions) | (self.dam == positions)
+            if own_parent.any():
+                raise ValueError(
+                    f"Animals {self.to_ids(np.flatnonzero(own_parent)).to_list()} are their own parent."
+                )
+            heights, in_cycle = _generation_heights(
+                len(self), positions, self.sire, self.dam
+            )
+            _check_acyclic(self.ids, in_cycle)
+            self._generations = heights.max(initial=0) - heights
+        return self._generations
+
+    def topological_order(self) -> np.ndarray:
+        """Returns all positions ordered so parents come before their progeny"""
+        return np.argsort(self.generations(), kind="stable")
+
+    def levels(self) -> list[np.ndarray]:
+        """Returns positions grouped by generation, earliest generation first"""
+        counts = np.bincount(self.generations())
+        return np.split(self.topological_order(), np.cumsum(counts)[:-1])
+
+    def lookup(self, ids: Collection[any] | pl.Series | pl.DataFrame) -> np.ndarray:
+        """Returns the position of each Id specified (`UnknownPosition` if not found)"""
+        if isinstance(ids, pl.DataFrame):
+            ids = ids.get_column(self.pedigree_labels[0])
+        ids = pl.Series(values=ids, dtype=self.ids.dtype)
+        if ids.len() == 0 or len(self) == 0:
+            return np.full(ids.len(), UnknownPosition, dtype=self.sire.dtype)
+        found = self._sorted_ids.search_sorted(ids).to_numpy().clip(0, len(self) - 1)
+        is_match = (self._sorted_ids.gather(found) == ids).fill_null(False).to_numpy()
+        return np.where(is_match, self._sort_order[found], UnknownPosition)
+
+    def positions(self, ids: Collection[any] | pl.Series | pl.DataFrame) -> np.ndarray:
+        """Returns the positions of the Ids specified (Ids not in the index are dropped)"""
+        positions = self.lookup(ids)
+        return positions[positions != UnknownPosition]
+
+    def to_ids(self, positions: np.ndarray) -> pl.Series:
+        """Returns the Ids at the positions specified"""
+        return self.ids.gather(positions)
+
+    def parents_of(self, positions: np.ndarray) -> np.ndarray:
+        """Returns the unique positions of the known parents of `positions`"""
+        parents = np.concatenate([self.sire[positions], self.dam[positions]])
+        return np.unique(parents[parents != UnknownPosition])
+
+    def progeny_of(self, positions: np.ndarray) -> np.ndarray:
+        """Returns the unique positions of the progeny of `positions`"""
+        return np.unique(_csr_gather(self.progeny_offsets, self.progeny, positions))
+
+    def _relatives_of(
+        self,
+        positions: np.ndarray,
+        relatives_function: callable,
+        generations: int = 100,
+        include_ids: bool = True,
+        lap: Callable[[int], None] | None = None,
+    ) -> np.ndarray:
+        """Breadth-first search from `positions` for up to `generations` steps
+
+        If given, `lap` is called with the number of new relatives found in each
+        generation (see `Profiler.laps`)."""
+        positions = np.unique(positions)
+        visited = np.zeros(len(self), dtype=bool)
+        visited[positions] = True
+        is_query = visited.copy()
+        relatives = [positions]
+        frontier = positions
+        g = 0
+        while generations > g and frontier.size != 0:
+            found = relatives_function(frontier)
+            if not include_ids:
+                relatives.append(found[is_query[found]])
+            frontier = found[~visited[found]]
+            visited[frontier] = True
+            relatives.append(frontier)
+            if lap is not None:
+                lap(frontier.size)
+            g += 1
+
+        if not include_ids:
+            relatives[0] = relatives[0][:0]
+        return np.unique(np.concatenate(relatives))
+
+    def ancestors_of(
+        self,
+        positions: np.ndarray,
+        generations: int = 100,
+        include_ids: bool = True,
+        lap: Callable[[int], None] | None = None,
+    ) -> np.ndarray:
+        """Returns the positions of the ancestors of `positions`"""
+        return self._relatives_of(
+            positions, self.parents_of, generations, include_ids, lap
+        )
+
+    def descendants_of(
+        self,
+        positions: np.ndarray,
+        generations: int = 100,
+        include_ids: bool = True,
+        lap: Callable[[int], None] | None = None,
+    ) -> np.ndarray:
+        """Returns the positions of the descendants of `positions`"""
+        return self._relatives_of(
+            positions, self.progeny_of, generations, include_ids, lap
+        )
+
+    def _annotated_relatives_of(
+        self,
+        positions: np.ndarray,
+        pairs_function: callable,
+        generations: int = 100,
+        include_ids: bool = True,
+        count_paths: bool = False,
+        lap: Callable[[int], None] | None = None,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray | None]:
+        """Search from `positions` recording the depth (& paths) of each relative
+
+        Returns relatives with their minimum number of generations from `positions`
+        & optionally the number of distinct paths reaching them within `generations`
+        (query animals count their own zero-length path if `include_ids`). To count
+        paths every animal reached in a generation is expanded, rather than only
+        those reached for the first time. Raises ValueError if path counts exceed
+        the Int64 range (paths can double with each generation of inbreeding). If
+        given, `lap` is called with the number of relatives reached in each
+        generation (see `Profiler.laps`)."""
+        positions = np.unique(positions)
+        first_reached = np.full(len(self), -1, dtype=np.int64)
+        first_reached[positions] = 0
+        is_query = first_reached == 0
+        query_reached = np.full(positions.size, -1, dtype=np.int64)
+        paths = np.zeros(len(self), dtype=np.int64) if count_paths else None
+        if count_paths:
+            paths[positions] = 1
+        relatives = [positions]
+        frontier = positions
+        weights = np.ones(positions.size, dtype=np.int64)
+        g = 0
+        while generations > g and frontier.size != 0:
+            source, found = pairs_function(np.arange(frontier.size), frontier)
+            found, inverse = np.unique(found, return_inverse=True)
+            if count_paths:
+                # int64 sums wrap silently, so check their size as floats first
+                totals = np.bincount(inverse, weights[source].astype(np.float64))
+                if (totals + paths[found]).max(initial=0) >= 2**63:
+                    raise ValueError(
+                        f"Path counts after {g + 1} generations exceed the Int64 "
+                        "range; use fewer `generations`."
+                    )
+                found_weights = np.zeros(found.size, dtype=np.int64)
+                np.add.at(found_weights, inverse, weights[source])
+                paths[found] += found_weights
+            hits = np.searchsorted(positions, found[is_query[found]])
+            query_reached[hits] = np.where(
+                query_reached[hits] == -1, g + 1, query_reached[hits]
+            )
+            new = found[first_reached[found] == -1]
+            first_reached[new] = g + 1
+            relatives.append(new)
+            frontier, weights = (found, found_weights) if count_paths else (new, None)
+            if lap is not None:
+                lap(found.size)
+            g += 1
+
+        depth = first_reached
+        if not include_ids:
+            reached = query_reached != -1
+            relatives[0] = positions[reached]
+            depth = first_reached.copy()
+            depth[positions] = query_reached
+            if count_paths:
+                paths[positions] -= 1
+        relatives = np.sort(np.concatenate(relatives))
+        return (
+            relatives,
+            depth[relatives],
+            paths[relatives] if count_paths else None,
+        )
+
+    def annotated_ancestors_of(
+        self,
+        positions: np.ndarray,
+        generations: int = 100,
+        include_ids: bool = True,
+        count_paths: bool = False,
+        lap: Callable[[int], None] | None = None,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray | None]:
+        """Returns the ancestors of `positions` with their depth (& number of paths)"""
+        return self._annotated_relatives_of(
+            positions, self._parent_pairs, generations, include_ids, count_paths, lap
+        )
+
+    def annotated_descendants_of(
+        self,
+        positions: np.ndarray,
+        generations: int = 100,
+        include_ids: bool = True,
+        count_paths: bool = False,
+        lap: Callable[[int], None] | None = None,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray | None]:
+        """Returns the descendants of `positions` with their depth (& number of paths)"""
+        return self._annotated_relatives_of(
+            positions, self._progeny_pairs, generations, include_ids, count_paths, lap
+        )
+
+    def _parent_pairs(
+        self, queries: np.ndarray, positions: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Returns (query, parent) pairs for the known parents of each position"""
+        parents = np.concatenate([self.sire[positions], self.dam[positions]])
+        queries = np.concatenate([queries, queries])
+        known = parents != UnknownPosition
+        return queries[known], parents[known]
+
+    def _progeny_pairs(
+        self, queries: np.ndarray, positions: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Returns (query, progeny) pairs for the progeny of each position"""
+        counts = self.progeny_offsets[positions + 1] - self.progeny_offsets[positions]
+        progeny = _csr_gather(self.progeny_offsets, self.progeny, positions)
+        return np.repeat(queries, counts), progeny
+
+    def _relatives_of_queries(
+        self,
+        queries: np.ndarray,
+        positions: np.ndarray,
+        relatives_function: callable,
+        generations: int = 100,
+        include_ids: bool = True,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Breadth-first search from (query, position) pairs, all queries at once
+
+        Pairs are keyed as `query * len(self) + position`, so each query keeps its
+        own visited set while the whole batch moves one generation per step. Visited
+        keys are held as sorted runs, so each step costs about the size of the
+        frontier rather than of everything visited so far."""
+        size = len(self)
+        keys = np.unique(queries.astype(np.int64) * size + positions)
+        visited = _SortedRuns()
+        frontier = visited.add_new(keys)
+        relatives = [keys] if include_ids else []
+        g = 0
+        while generations > g and frontier.size != 0:
+            query, found = relatives_function(frontier // size, frontier % size)
+            found = np.unique(query * size + found)
+            if not include_ids:
+                relatives.append(found[_is_in_sorted(found, keys)])
+            frontier = visited.add_new(found)
+            relatives.append(frontier)
+            g += 1
+
+        relatives = np.unique(np.concatenate([keys[:0], *relatives]))
+        return relatives // size, (relatives % size).astype(self.sire.dtype)
+
+    def ancestors_of_queries(
+        self,
+        queries: np.ndarray,
+        positions: np.ndarray,
+        generations: int = 100,
+        include_ids: bool = True,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Returns (query, ancestor) pairs for the ancestors of each query's positions"""
+        return self._relatives_of_queries(
+            queries, positions, self._parent_pairs, generations, include_ids
+        )
+
+    def descendants_of_queries(
+        self,
+        queries: np.ndarray,
+        positions: np.ndarray,
+        generations: int = 100,
+        include_ids: bool = True,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Returns (query, descendant) pairs for the descendants of each query's positions"""
+        return self._relatives_of_queries(
+            queries, positions, self._progeny_pairs, generations, include_ids
+        )
@@ -0,0 +1,181 @@
+import multiprocessing
+import os
+from collections import deque
+from collections.abc import Collection, Iterator
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import polars as pl
+
+from pedpol.core import PedigreeLabels
+from pedpol.index import PedigreeIndex, UnknownPosition
+from pedpol.relationships import _column_at, _mendelian_variance, _meuwissen_luo
+
+_subgraph = {}
+"""Ancestor subgraph shared by the blocks computed in a pool worker process"""
+
+
+def _ordered_subgraph(
+    index: PedigreeIndex, positions: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Returns the ancestors of `positions` in parents-before-progeny order
+
+    Returns the index positions of the ancestors, their parents' positions within
+    the subgraph (or `UnknownPosition`) & the generation of each, which never
+    decreases."""
+    ancestors = index.ancestors_of(positions, generations=len(index))
+    generation = index.generations()[ancestors]
+    order = np.argsort(generation, kind="stable")
+    ancestors, generation = ancestors[order], generation[order]
+    local = np.full(len(index), UnknownPosition, dtype=np.int64)
+    local[ancestors] = np.arange(ancestors.size)
+    sire, dam = index.sire[ancestors], index.dam[ancestors]
+    sire = np.where(sire == UnknownPosition, UnknownPosition, local[sire])
+    dam = np.where(dam == UnknownPosition, UnknownPosition, local[dam])
+    return ancestors, sire, dam, generation
+
+
+def _subgraph_of(
+    sire: np.ndarray,
+    dam: np.ndarray,
+    variance: np.ndarray,
+    generation: np.ndarray,
+    dams: np.ndarray,
+) -> dict:
+    """Returns the subgraph used by `_progeny_inbreeding_block`"""
+    starts = np.searchsorted(generation, np.unique(generation))
+    return {
+        "sire": sire,
+        "dam": dam,
+        "variance": variance,
+        "levels": list(zip(starts, [*starts[1:], sire.size])),
+        "dams": dams,
+    }
+
+
+def _set_subgraph(*subgraph: np.ndarray) -> None:
+    """Holds the subgraph in a pool worker process (see `_subgraph_of`)"""
+    _subgraph.update(_subgraph_of(*subgraph))
+
+
+def _progeny_inbreeding_block(
+    sires: np.ndarray, subgraph: dict | None = None
+) -> np.ndarray:
+    """Returns the inbreeding of progeny of `sires` (rows) with every dam (columns)
+
+    Columns of the relationship matrix for the sires are found as A x = T D T' x
+    (Colleau, 2002), with a pass up & a pass down the generations of the subgraph
+    (by default that of the pool worker process)."""
+    if subgraph is None:
+        subgraph = _subgraph
+    sire, dam, variance = subgraph["sire"], subgraph["dam"], subgraph["variance"]
+    levels, dams = subgraph["levels"], subgraph["dams"]
+    known_sires = np.flatnonzero(sires != UnknownPosition)
+    x = np.zeros((sire.size, sires.size))
+    x[sires[known_sires], known_sires] = 1
+
+    for lo, hi in reversed(levels):  # T'x, youngest generation first
+        for parent in (sire[lo:hi], dam[lo:hi]):
+            known = parent != UnknownPosition
+            np.add.at(x, parent[known], 0.5 * x[lo:hi][known])
+    x *= variance[:, None]
+    for lo, hi in levels:  # T(DT'x), earliest generation first
+        for parent in (sire[lo:hi], dam[lo:hi]):
+            known = np.flatnonzero(parent != UnknownPosition)
+            x[lo + known] += 0.5 * x[parent[known]]
+
+    inbreeding = np.zeros((sires.size, dams.size))
+    known_dams = np.flatnonzero(dams != UnknownPosition)
+    inbreeding[:, known_dams] = 0.5 * x[dams[known_dams]].T
+    return inbreeding
+
+
+def get_progeny_inbreeding(
+    pedigree: pl.DataFrame | pl.LazyFrame,
+    sire_ids: Collection[any] | pl.Series,
+    dam_ids: Collection[any] | pl.Series,
+    pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    inbreeding_label: str | None = None,
+    index: PedigreeIndex | None = None,
+    block_size: int = 32,
+    max_workers: int | None = 1,
+) -> Iterator[pl.DataFrame]:
+    """Yields the inbreeding of the progeny of every sire with every dam, in blocks
+
+    Each block has `sire`, `dam` & `inbreeding` columns for `block_size` sires
+    crossed with all dams, so the whole grid is never held in memory. Progeny
+    inbreeding is half the relationship of the parents, found for a block of sires
+    at once by Colleau's (2002) indirect method over the ancestors of the sires &
+    dams (see `get_ancestors_of`), with Mendelian sampling variances from the
+    inbreeding in `inbreeding_label` (see `compute_inbreeding`) or, if not given, a
+    Meuwissen & Luo pass. Blocks are computed in this process by default, or on a
+    pool of `max_workers` processes (None for the number of cores) & are yielded in
+    order of `sire_ids`. Animals not in the pedigree are treated as unrelated
+    founders. The pool starts processes with 'spawn', so scripts using it must
+    call this under an `if __name__ == "__main__":` guard.
+
+    ### Example use:
+    ```python
+    if __name__ == "__main__":
+        blocks = get_progeny_inbreeding(ped_df, sire_ids, dam_ids, lbls, max_workers=8)
+        for block in blocks:
+            block.filter(pl.col("inbreeding") < 0.0625).write_parquet(...)
+    ```"""
+    if index is None:
+        index = PedigreeIndex.from_pedigree(pedigree, pedigree_labels)
+    dtype = index.ids.dtype
+    sire_ids = pl.Series("sire", sire_ids, dtype=dtype)
+    dam_ids = pl.Series("dam", dam_ids, dtype=dtype)
+    sires, dams = index.lookup(sire_ids), index.lookup(dam_ids)
+    queries = np.concatenate([sires, dams])
+    ancestors, sire, dam, generation = _ordered_subgraph(
+        index, queries[queries != UnknownPosition]
+    )
+    if inbreeding_label is None:
+        variance = _meuwissen_luo(sire, dam, generation)[1]
+    else:
+        inbreeding = _column_at(pedigree, index, inbreeding_label)[ancestors]
+        variance = _mendelian_variance(sire, dam, inbreeding)
+
+    # positions within the subgraph
+    local = np.full(len(index), UnknownPosition, dtype=np.int64)
+    local[ancestors] = np.arange(ancestors.size)
+    sires = np.where(sires == UnknownPosition, UnknownPosition, local[sires])
+    dams = np.where(dams == UnknownPosition, UnknownPosition, local[dams])
+    subgraph = (sire, dam, variance, generation, dams)
+    blocks = [sires[b : b + block_size] for b in range(0, sires.size, block_size)]
+
+    def to_frame(b: int, inbreeding: np.ndarray) -> pl.DataFrame:
+        block_sires = sire_ids.slice(b * block_size, block_size)
+        return pl.DataFrame(
+            {
+                "sire": block_sires.gather(
+                    np.repeat(np.arange(block_sires.len()), dam_ids.len())
+                ),
+                "dam": pl.concat([dam_ids] * block_sires.len()),
+                "inbreeding": inbreeding.reshape(-1),
+            }
+        )
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(blocks) <= 1:
+        subgraph = _subgraph_of(*subgraph)
+        for b, block in enumerate(blocks):
+            yield to_frame(b, _progeny_inbreeding_block(block, subgraph))
+        return
+
+    with ProcessPoolExecutor(
+        max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_set_subgraph,
+        initargs=subgraph,
+    ) as executor:
+        # keep a bounded number of blocks in flight, so results don't pile up
+        pending = deque()
+        for b, block in enumerate(blocks):
+            pending.append(executor.submit(_progeny_inbreeding_block, block))
+            if len(pending) >= 2 * max_workers:
+                yield to_frame(b - len(pending) + 1, pending.popleft().result())
+        first = len(blocks) - len(pending)
+        for b, future in enumerate(pending, start=first):
+            yield to_frame(b, future.result())
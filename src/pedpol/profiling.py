@@ -0,0 +1,116 @@
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+
+import polars as pl
+
+
+class Profiler:
+    """Records the wall time, rows & query plan of each step of pedpol functions
+
+    Pass a `Profiler` as the `profiler` argument of a function to opt in, then
+    inspect `to_frame()`. Each record has the `stage` (function profiled), the
+    `step` within it, the `iteration` of steps run in a loop, `seconds`, `rows`
+    produced & the optimized query `plan` (if `explain` is True & the step is a
+    polars query).
+
+    ### Example use:
+    ```python
+    profiler = Profiler()
+    validate_pedigree(ped_df, lbls, profiler=profiler)
+    profiler.to_frame().sort("seconds", descending=True)
+    ```"""
+
+    def __init__(self, explain: bool = True):
+        self.explain = explain
+        self.records = []
+
+    def record(
+        self,
+        stage: str,
+        step: str,
+        seconds: float,
+        rows: int | None = None,
+        plan: str | None = None,
+        iteration: int | None = None,
+    ) -> None:
+        """Records the timing of a single step"""
+        self.records.append(
+            {
+                "stage": stage,
+                "step": step,
+                "iteration": iteration,
+                "seconds": seconds,
+                "rows": rows,
+                "plan": plan,
+            }
+        )
+
+    @contextmanager
+    def time(self, stage: str, step: str) -> Iterator[None]:
+        """Records the wall time of the `with` block as `step`"""
+        start = perf_counter()
+        yield
+        self.record(stage, step, perf_counter() - start)
+
+    def collect(
+        self,
+        stage: str,
+        step: str,
+        query: pl.LazyFrame,
+        iteration: int | None = None,
+    ) -> pl.DataFrame:
+        """Collects `query`, recording its wall time, rows & optimized plan"""
+        plan = query.explain() if self.explain else None
+        start = perf_counter()
+        result = query.collect()
+        self.record(stage, step, perf_counter() - start, result.height, plan, iteration)
+        return result
+
+    def laps(self, stage: str, step: str) -> Callable[[int | None], None]:
+        """Returns a function recording each call as the next iteration of `step`
+
+        Each iteration's time is from the previous call (or this one) & the
+        function is passed the number of rows processed in the iteration."""
+        start = perf_counter()
+        iteration = 0
+
+        def lap(rows: int | None = None) -> None:
+            nonlocal start, iteration
+            now = perf_counter()
+            self.record(stage, step, now - start, rows, iteration=iteration)
+            start, iteration = now, iteration + 1
+
+        return lap
+
+    def to_frame(self) -> pl.DataFrame:
+        """Returns the records as a DataFrame, in the order steps were run"""
+        return pl.DataFrame(
+            self.records,
+            schema={
+                "stage": pl.String,
+                "step": pl.String,
+                "iteration": pl.Int32,
+                "seconds": pl.Float64,
+                "rows": pl.Int64,
+                "plan": pl.String,
+            },
+        )
+
+
+def _timer(profiler: Profiler | None, stage: str, step: str):
+    """Returns a context timing `step` if profiling, otherwise doing nothing"""
+    return nullcontext() if profiler is None else profiler.time(stage, step)
+
+
+def _collect(
+    profiler: Profiler | None,
+    stage: str,
+    step: str,
+    query: pl.LazyFrame,
+    iteration: int | None = None,
+) -> pl.DataFrame:
+    """Collects `query`, recording the step if profiling"""
+    if profiler is None:
+        return query.collect()
+    return profiler.collect(stage, step, query, iteration)
@@ -0,0 +1,341 @@
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+from pedpol.core import PedigreeLabels
+from pedpol.index import PedigreeIndex, UnknownPosition
+
+
+def _ordered_parents(
+    index: PedigreeIndex,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Returns the parents-before-progeny order of positions & the parents' ranks
+
+    Parent ranks are positions in that order (always less than the progeny's rank),
+    or `UnknownPosition` for unknown parents. Also returns the generation of each
+    rank, which never decreases."""
+    order = index.topological_order()
+    rank = np.empty(len(index), dtype=np.int64)
+    rank[order] = np.arange(len(index))
+    sire, dam = index.sire[order], index.dam[order]
+    sire_rank = np.where(sire == UnknownPosition, UnknownPosition, rank[sire])
+    dam_rank = np.where(dam == UnknownPosition, UnknownPosition, rank[dam])
+    return order, sire_rank, dam_rank, index.generations()[order]
+
+
+def _trace_ancestors(
+    paths: tuple[np.ndarray, np.ndarray, np.ndarray],
+    sire: np.ndarray,
+    dam: np.ndarray,
+    generation: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Yields the summed path coefficients from each query to each of its ancestors
+
+    `paths` holds (query, ancestor, coefficient) arrays to start from. Ancestors are
+    processed youngest generation first, so each (query, ancestor) coefficient is
+    complete when it is yielded and then passed on at half weight to the parents."""
+    size = sire.size
+    pending = {}
+
+    def push(query, ancestor, coefficient):
+        gens = generation[ancestor]
+        for g in np.unique(gens):
+            is_g = gens == g
+            pending.setdefault(g, []).append(
+                (query[is_g], ancestor[is_g], coefficient[is_g])
+            )
+
+    push(*paths)
+    while pending:
+        g = max(pending)
+        query, ancestor, coefficient = map(np.concatenate, zip(*pending.pop(g)))
+        keys, inverse = np.unique(query * size + ancestor, return_inverse=True)
+        coefficient = np.bincount(inverse, weights=coefficient)
+        query, ancestor = keys // size, keys % size
+        yield query, ancestor, coefficient
+
+        for parent in (sire[ancestor], dam[ancestor]):
+            known = parent != UnknownPosition
+            push(query[known], parent[known], 0.5 * coefficient[known])
+
+
+def _meuwissen_luo(
+    sire: np.ndarray,
+    dam: np.ndarray,
+    generation: np.ndarray,
+    batch_size: int = 4096,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Returns inbreeding coefficients & Mendelian sampling variances
+
+    `sire` & `dam` hold parent ranks in a parents-before-progeny order. Works a
+    generation at a time: the ancestors of each full-sib family (Sargolzaei et al.,
+    2005) are traced together as vectorized batches, with the diagonal of the
+    relationship matrix accumulated as in Meuwissen & Luo (1992)."""
+    inbreeding = np.zeros(sire.size)
+    variance = np.ones(sire.size)
+    starts = np.searchsorted(generation, np.unique(generation))
+    for lo, hi in zip(starts, [*starts[1:], sire.size]):
+        s, d = sire[lo:hi], dam[lo:hi]
+        s_known, d_known = s != UnknownPosition, d != UnknownPosition
+        half = np.flatnonzero(s_known ^ d_known)
+        variance[lo + half] = 0.75 - 0.25 * inbreeding[np.maximum(s, d)[half]]
+
+        both = np.flatnonzero(s_known & d_known)
+        families, family = np.unique(
+            np.stack([s[both], d[both]]), axis=1, return_inverse=True
+        )
+        family_inbreeding = np.empty(families.shape[1])
+        for b in range(0, families.shape[1], batch_size):
+            fs, fd = families[0, b : b + batch_size], families[1, b : b + batch_size]
+            query = np.arange(fs.size)
+            diagonal = 0.5 - 0.25 * (inbreeding[fs] + inbreeding[fd])
+            paths = (
+                np.concatenate([query, query]),
+                np.concatenate([fs, fd]),
+                np.full(2 * fs.size, 0.5),
+            )
+            for q, ancestor, coefficient in _trace_ancestors(
+                paths, sire, dam, generation
+            ):
+                diagonal += np.bincount(
+                    q, coefficient**2 * variance[ancestor], minlength=fs.size
+                )
+            family_inbreeding[b : b + batch_size] = diagonal - 1.0
+
+        inbreeding[lo + both] = family_inbreeding[family.reshape(-1)]
+        variance[lo + both] = 0.5 - 0.25 * (inbreeding[s[both]] + inbreeding[d[both]])
+    return inbreeding, variance
+
+
+def _mendelian_variance(
+    sire: np.ndarray, dam: np.ndarray, inbreeding: np.ndarray
+) -> np.ndarray:
+    """Returns Mendelian sampling variances from the inbreeding of known parents"""
+    variance = np.ones(sire.size)
+    for parent in (sire, dam):
+        known = parent != UnknownPosition
+        variance[known] -= 0.25 * (1 + inbreeding[parent[known]])
+    return variance
+
+
+def _column_at(
+    pedigree: pl.DataFrame | pl.LazyFrame, index: PedigreeIndex, label: str
+) -> np.ndarray:
+    """Returns a numeric column at each position of the index (0 if no record)"""
+    animal = index.pedigree_labels[0]
+    values = (
+        pl.DataFrame({animal: index.ids})
+        .join(
+            pedigree.lazy()
+            .select(animal, label)
+            .unique(animal, keep="first")
+            .collect(),
+            on=animal,
+            how="left",
+            maintain_order="left",
+        )
+        .get_column(label)
+    )
+    return values.fill_null(0).to_numpy().astype(np.float64)
+
+
+def _inbreeding_of(index: PedigreeIndex) -> np.ndarray:
+    """Returns the inbreeding coefficient at each position of the index"""
+    order, sire_rank, dam_rank, generation = _ordered_parents(index)
+    inbreeding = np.empty(len(index))
+    inbreeding[order] = _meuwissen_luo(sire_rank, dam_rank, generation)[0]
+    return inbreeding
+
+
+def compute_inbreeding(
+    pedigree: pl.DataFrame | pl.LazyFrame,
+    pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    index: PedigreeIndex | None = None,
+) -> pl.DataFrame | pl.LazyFrame:
+    """Adds an `inbreeding` column with the inbreeding coefficient of each animal
+
+    Coefficients are computed over array-backed parent vectors in a
+    parents-before-progeny order, so results can be joined back to the original
+    Ids of a recoded pedigree using the `id_map` returned by `recode_pedigree`.
+    Parents without their own record are treated as founders.
+
+    ### Example use:
+    ```python
+    recoded_df, id_map = recode_pedigree(ped_df, lbls)
+    recoded_df = compute_inbreeding(recoded_df, lbls)
+    ```"""
+    animal = pedigree_labels[0]
+    if index is None:
+        index = PedigreeIndex.from_pedigree(pedigree, pedigree_labels)
+    inbreeding = pl.DataFrame(
+        {animal: index.ids, "inbreeding": _inbreeding_of(index)}
+    ).filter(index.has_record)
+    if isinstance(pedigree, pl.LazyFrame):
+        inbreeding = inbreeding.lazy()
+    return pedigree.join(inbreeding, on=animal, how="left", maintain_order="left")
+
+
+def get_ainverse(
+    pedigree: pl.DataFrame | pl.LazyFrame,
+    pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    inbreeding_label: str | None = None,
+    path: str | Path | None = None,
+) -> pl.DataFrame | None:
+    """Returns the nonzero lower triangle of the inverse relationship matrix
+
+    Uses Henderson's rules on a recoded pedigree (see `recode_pedigree`), accounting
+    for inbreeding of parents if `inbreeding_label` is given (see
+    `compute_inbreeding`). Every animal's contributions are built as columns and
+    summed with a single `group_by`, giving `row`, `column` & `value` triplets with
+    `row` >= `column`. If `path` is given the triplets are streamed to a Parquet
+    file instead of being returned.
+
+    ### Example use:
+    ```python
+    recoded_df, id_map = recode_pedigree(ped_df, lbls)
+    ainv_df = get_ainverse(compute_inbreeding(recoded_df, lbls), lbls, "inbreeding")
+    ```"""
+    animal, sire, dam = pedigree_labels
+    inbreeding = pl.col(inbreeding_label) if inbreeding_label else pl.lit(0.0)
+    pedigree = pedigree.lazy().select(animal, sire, dam, inbreeding.alias("F"))
+    for parent in (sire, dam):
+        pedigree = pedigree.join(
+            pedigree.select(animal, pl.col("F").alias(f"F_{parent}")),
+            left_on=parent,
+            right_on=animal,
+            how="left",
+        )
+
+    parent_variance = [
+        pl.when(pl.col(parent).is_null())
+        .then(0.0)
+        .otherwise(0.25 * (1 + pl.col(f"F_{parent}")))
+        for parent in (sire, dam)
+    ]
+    pedigree = pedigree.with_columns(
+        (1 / (1 - parent_variance[0] - parent_variance[1])).alias("delta")
+    )
+
+    def contribution(row: pl.Expr, column: pl.Expr, value: pl.Expr) -> pl.LazyFrame:
+        return pedigree.filter(row.is_not_null() & column.is_not_null()).select(
+            pl.max_horizontal(row, column).alias("row"),
+            pl.min_horizontal(row, column).alias("column"),
+            value.alias("value"),
+        )
+
+    delta = pl.col("delta")
+    ainverse = (
+        pl.concat(
+            [
+                contribution(pl.col(animal), pl.col(animal), delta),
+                contribution(pl.col(animal), pl.col(sire), -delta / 2),
+                contribution(pl.col(animal), pl.col(dam), -delta / 2),
+                contribution(pl.col(sire), pl.col(sire), delta / 4),
+                contribution(pl.col(dam), pl.col(dam), delta / 4),
+                contribution(
+                    pl.col(sire),
+                    pl.col(dam),
+                    delta / 4 * (1 + (pl.col(sire) == pl.col(dam)).cast(pl.Float64)),
+                ),
+            ]
+        )
+        .group_by("row", "column")
+        .agg(pl.col("value").sum())
+        .sort("row", "column")
+    )
+    if path is not None:
+        return ainverse.sink_parquet(path)
+    return ainverse.collect()
+
+
+def get_relationships(
+    pedigree: pl.DataFrame | pl.LazyFrame,
+    pairs: pl.DataFrame | pl.LazyFrame,
+    pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    pair_labels: tuple[str, str] | None = None,
+    inbreeding_label: str | None = None,
+    index: PedigreeIndex | None = None,
+    batch_size: int = 4096,
+) -> pl.DataFrame | pl.LazyFrame:
+    """Adds a `relationship` column with the additive relationship of each pair
+
+    `pairs` has the Ids of the two animals of each pair in `pair_labels` (default its
+    first two columns). Relationships are found without forming the relationship
+    matrix A = TDT', as the sum over common ancestors k of T_ik * T_jk * D_k: the
+    ancestors of the animals in `batch_size` pairs are traced together (each animal
+    once), with the Mendelian sampling variances D from the inbreeding of parents in
+    `inbreeding_label` (see `compute_inbreeding`) or, if not given, a Meuwissen &
+    Luo pass. The relationship of an animal with itself is 1 + its inbreeding & the
+    coancestry of a pair is half their relationship. Pairs with an animal not in the
+    pedigree have a null relationship.
+
+    ### Example use:
+    ```python
+    matings = pl.DataFrame({"sire": [1, 1, 2], "dam": [5, 6, 5]})
+    get_relationships(ped_df, matings, lbls)
+    ```"""
+    if index is None:
+        index = PedigreeIndex.from_pedigree(pedigree, pedigree_labels)
+    order, sire_rank, dam_rank, generation = _ordered_parents(index)
+    if inbreeding_label is None:
+        variance = _meuwissen_luo(sire_rank, dam_rank, generation)[1]
+    else:
+        variance = _mendelian_variance(
+            sire_rank, dam_rank, _column_at(pedigree, index, inbreeding_label)[order]
+        )
+    rank = np.empty(len(index), dtype=np.int64)
+    rank[order] = np.arange(len(index))
+
+    is_lazy = isinstance(pairs, pl.LazyFrame)
+    pairs = pairs.lazy().collect()
+    first, second = pair_labels or pairs.columns[:2]
+    first, second = index.lookup(pairs[first]), index.lookup(pairs[second])
+    found = np.flatnonzero((first != UnknownPosition) & (second != UnknownPosition))
+    first, second = rank[first[found]], rank[second[found]]
+
+    relationship = np.full(pairs.height, np.nan)
+    for b in range(0, found.size, batch_size):
+        batch = slice(b, b + batch_size)
+        animals, inverse = np.unique(
+            np.concatenate([first[batch], second[batch]]), return_inverse=True
+        )
+        paths = (np.arange(animals.size), animals, np.ones(animals.size))
+        query, ancestor, coefficient = map(
+            np.concatenate,
+            zip(*_trace_ancestors(paths, sire_rank, dam_rank, generation)),
+        )
+        traced = pl.DataFrame(
+            {"query": query, "ancestor": ancestor, "coefficient": coefficient}
+        )
+        pair_count = inverse.size // 2
+        common = (
+            pl.DataFrame(
+                {
+                    "pair": np.arange(pair_count),
+                    "query": inverse[:pair_count],
+                    "other": inverse[pair_count:],
+                }
+            )
+            .join(traced, on="query")
+            .join(
+                traced.rename({"query": "other", "coefficient": "other_coefficient"}),
+                on=["other", "ancestor"],
+            )
+            .select(
+                "pair",
+                "ancestor",
+                pl.col("coefficient") * pl.col("other_coefficient"),
+            )
+        )
+        relationship[found[batch]] = np.bincount(
+            common.get_column("pair").to_numpy(),
+            common.get_column("coefficient").to_numpy()
+            * variance[common.get_column("ancestor").to_numpy()],
+            minlength=pair_count,
+        )
+
+    pairs = pairs.with_columns(
+        pl.Series("relationship", relationship, nan_to_null=True)
+    )
+    return pairs.lazy() if is_lazy else pairs
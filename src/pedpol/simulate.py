@@ -0,0 +1,146 @@
+import numpy as np
+import polars as pl
+
+from pedpol.core import PedigreeLabels, SexIds, SexLabel
+
+PedigreeErrors = (
+    "own_parent",
+    "multiple_records",
+    "both_sire_and_dam",
+    "no_own_record",
+    "circular",
+)
+"""Kinds of error that can be injected into a simulated pedigree"""
+
+
+def _inject_errors(
+    rng: np.random.Generator,
+    sire: np.ndarray,
+    dam: np.ndarray,
+    generation: np.ndarray,
+    errors: dict[str, int],
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Returns records (as positions) with the requested numbers of errors injected
+
+    Unknown parents are -1 & parents without their own record are positions beyond
+    the animals simulated. Also returns the position of the animal of each record."""
+    if unknown := set(errors) - set(PedigreeErrors):
+        raise ValueError(f"Unknown pedigree errors {sorted(unknown)}.")
+    size = sire.size
+    animal = np.arange(size)
+    touched = np.zeros(size, dtype=bool)
+
+    def pick(is_candidate: np.ndarray, kind: str) -> np.ndarray:
+        candidates = np.flatnonzero(is_candidate & ~touched)
+        count = errors.get(kind, 0)
+        if count > candidates.size:
+            raise ValueError(
+                f"Pedigree is too small to inject {count} {kind!r} errors."
+            )
+        picked = rng.choice(candidates, count, replace=False)
+        touched[picked] = True
+        return picked
+
+    # an animal becomes the dam of its own sire, so each is the other's ancestor
+    has_grandsire = (sire != -1) & (sire[np.maximum(sire, 0)] != -1)
+    circular = pick(has_grandsire & ~touched[np.maximum(sire, 0)], "circular")
+    dam[sire[circular]] = circular
+    touched[sire[circular]] = True
+    own = pick(generation > 0, "own_parent")
+    sire[own] = own
+    missing = pick(sire != -1, "no_own_record")
+    sire[missing] = size + np.arange(missing.size)
+    both = pick(dam != -1, "both_sire_and_dam")
+    dam[both] = rng.choice(sire[(sire != -1) & (sire < size)], both.size)
+    multiple = pick(dam != -1, "multiple_records")
+    duplicate_dam = rng.choice(dam[dam != -1], multiple.size)
+    return (
+        np.concatenate([animal, multiple]),
+        np.concatenate([sire, sire[multiple]]),
+        np.concatenate([dam, duplicate_dam]),
+    )
+
+
+def simulate_pedigree(
+    n_animals: int,
+    n_generations: int = 10,
+    founder_fraction: float = 0.05,
+    unknown_rate: float = 0.0,
+    sire_fraction: float = 0.05,
+    literal_ids: bool = False,
+    errors: dict[str, int] | None = None,
+    seed: int | None = None,
+    pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+) -> pl.DataFrame:
+    """Returns a simulated pedigree of `n_animals` records over `n_generations`
+
+    A `founder_fraction` of animals have unknown parents & the rest are spread
+    evenly over later generations. Each generation's sires are a selected
+    `sire_fraction` of the males & its dams any females, from up to three
+    previous generations. Known parents are then made unknown at `unknown_rate`.
+    Records have `pedigree_labels`, a `sex` column (using `SexIds`) & a
+    `birth_year`, in birth order. Ids are integers from 1, or strings if
+    `literal_ids` is True.
+
+    `errors` gives the number of each kind of error in `PedigreeErrors` to inject,
+    like those in `ped_errors.csv`, for testing validation. The same `seed` always
+    gives the same pedigree.
+
+    ### Example use:
+    ```python
+    ped_df = simulate_pedigree(1_000_000, unknown_rate=0.1, seed=1)
+    ped_df = simulate_pedigree(1_000, errors={"own_parent": 2, "circular": 1})
+    ```"""
+    rng = np.random.default_rng(seed)
+    n_founders = (
+        n_animals if n_generations == 1 else max(2, round(n_animals * founder_fraction))
+    )
+    sizes = np.diff(
+        np.linspace(n_founders, n_animals, n_generations).round(), prepend=0
+    )
+    starts = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+    generation = np.repeat(np.arange(n_generations), sizes.astype(np.int64))
+    is_male = rng.random(n_animals) < 0.5
+    sire = np.full(n_animals, -1, dtype=np.int64)
+    dam = np.full(n_animals, -1, dtype=np.int64)
+
+    for gen in range(1, n_generations):
+        lo, hi = starts[max(0, gen - 3)], starts[gen]
+        males = lo + np.flatnonzero(is_male[lo:hi])
+        females = lo + np.flatnonzero(~is_male[lo:hi])
+        males = males if males.size else np.arange(lo, hi)
+        females = females if females.size else np.arange(lo, hi)
+        selected = rng.choice(
+            males, max(1, round(males.size * sire_fraction)), replace=False
+        )
+        progeny = slice(starts[gen], starts[gen + 1])
+        sire[progeny] = rng.choice(selected, sizes[gen].astype(np.int64))
+        dam[progeny] = rng.choice(females, sizes[gen].astype(np.int64))
+
+    for parent in (sire, dam):
+        parent[rng.random(n_animals) < unknown_rate] = -1
+    is_male[sire[sire != -1]] = True
+    is_male[dam[dam != -1]] = False
+
+    animal, sire, dam = _inject_errors(rng, sire, dam, generation, errors or {})
+    animal_label, sire_label, dam_label = pedigree_labels
+    pedigree = pl.DataFrame(
+        {
+            animal_label: animal + 1,
+            sire_label: np.where(sire == -1, 0, sire + 1),
+            dam_label: np.where(dam == -1, 0, dam + 1),
+            SexLabel: np.where(is_male[animal], *SexIds),
+            "birth_year": 2000 + generation[animal],
+        },
+        schema_overrides={SexLabel: pl.Int8, "birth_year": pl.Int32},
+    ).with_columns(pl.col(sire_label, dam_label).replace(0, None))
+    pedigree = pedigree.sort("birth_year", maintain_order=True)
+    if literal_ids:
+        width = len(str(2 * n_animals))
+        pedigree = pedigree.with_columns(
+            pl.format("A{}", pl.col(label).cast(pl.String).str.zfill(width)).alias(
+                label
+            )
+            for label in pedigree_labels
+        )
+    return pedigree
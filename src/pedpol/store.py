@@ -0,0 +1,92 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+from pedpol.core import PedigreeLabels, null_unknown_parents
+from pedpol.index import PedigreeIndex
+
+StoreVersion = 1
+"""Version of the layout of `PedigreeStore` directories"""
+
+
+class PedigreeStore:
+    """Directory of Arrow IPC files holding a cleaned pedigree & its index
+
+    The pedigree (with unknown parents as null), the integer parent positions,
+    record flags, sort order & generations of its `PedigreeIndex` and the progeny
+    adjacency are saved uncompressed, so opening a store memory maps the files
+    rather than parsing & rebuilding them. Processes opening the same store share
+    its pages. Use `index` for relatives queries & `scan()` for lazy queries.
+
+    ### Example use:
+    ```python
+    PedigreeStore.create(pl.scan_csv("pedigree.csv"), "pedigree_store", lbls)
+    store = PedigreeStore("pedigree_store")
+    get_ancestors_of(store.pedigree, ids, pedigree_labels=lbls, index=store.index)
+    ```"""
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        metadata = json.loads((self.directory / "metadata.json").read_text())
+        if metadata["version"] != StoreVersion:
+            raise ValueError(
+                f"Pedigree store {self.directory} has version {metadata['version']}, expected {StoreVersion}."
+            )
+        self.pedigree_labels = tuple(metadata["pedigree_labels"])
+        self.pedigree = pl.read_ipc(self.directory / "pedigree.arrow")
+        positions = pl.read_ipc(self.directory / "index.arrow")
+        progeny = pl.read_ipc(self.directory / "progeny.arrow")
+        offsets = pl.read_ipc(self.directory / "progeny_offsets.arrow")
+
+        def array(frame: pl.DataFrame, column: str) -> np.ndarray:
+            return frame.get_column(column).to_numpy()
+
+        self.index = PedigreeIndex(
+            positions.get_column("id"),
+            array(positions, "sire"),
+            array(positions, "dam"),
+            array(positions, "has_record"),
+            self.pedigree_labels,
+            progeny=(array(offsets, "offset"), array(progeny, "progeny")),
+            sort_order=array(positions, "sort_order"),
+            generations=array(positions, "generation"),
+        )
+
+    @classmethod
+    def create(
+        cls,
+        pedigree: pl.DataFrame | pl.LazyFrame,
+        directory: str | Path,
+        pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+        unknown_parent_value=None,
+    ) -> "PedigreeStore":
+        """Saves a pedigree & its index to `directory`, returning the opened store
+
+        Unknown parents (`unknown_parent_value`, see `null_unknown_parents`) are
+        replaced with null. Raises a ValueError if the pedigree is circular."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        pedigree = null_unknown_parents(
+            pedigree.lazy(), pedigree_labels[1:], unknown_parent_value
+        ).collect()
+        index = PedigreeIndex.from_pedigree(pedigree, pedigree_labels)
+        pedigree.write_ipc(directory / "pedigree.arrow")
+        index.to_frame().with_columns(
+            sort_order=index._sort_order, generation=index.generations()
+        ).write_ipc(directory / "index.arrow")
+        pl.DataFrame({"progeny": index.progeny}).write_ipc(directory / "progeny.arrow")
+        pl.DataFrame({"offset": index.progeny_offsets}).write_ipc(
+            directory / "progeny_offsets.arrow"
+        )
+        (directory / "metadata.json").write_text(
+            json.dumps(
+                {"version": StoreVersion, "pedigree_labels": list(pedigree_labels)}
+            )
+        )
+        return cls(directory)
+
+    def scan(self) -> pl.LazyFrame:
+        """Returns a lazy query of the stored pedigree"""
+        return pl.scan_ipc(self.directory / "pedigree.arrow")
@@ -1,7 +1,13 @@
+from pathlib import Path
+
+import numpy as np
 import polars as pl
 
-from pedpol.core import PedigreeLabels, SexIds, SexLabel, parents
+from pedpol.cache import PedigreeCache, pedigree_fingerprint
+from pedpol.core import PedigreeLabels, SexIds, SexLabel, parents, pedigree_ids
 from pedpol.generations import classify_generations
+from pedpol.index import _circular_components, _encode_pedigree
+from pedpol.profiling import Profiler, _timer
 
 
 def get_parents_both_sires_and_dams(
@@ -24,10 +30,15 @@ def get_parents_both_sires_and_dams(
 def get_animals_with_multiple_records(
     pedigree: pl.LazyFrame | pl.DataFrame,
     pedigree_labels: tuple[str, str, str] = PedigreeLabels,
-) -> pl.DataFrame:
+) -> pl.LazyFrame | pl.DataFrame:
     """Returns any animals that have multiple pedigree records"""
     animal = pedigree_labels[0]
-    return pedigree.filter(pedigree.lazy().select(animal).collect().is_duplicated())
+    return pedigree.join(
+        pedigree.group_by(animal).len().filter(pl.col("len") > 1),
+        on=animal,
+        how="semi",
+        maintain_order="left",
+    )
 
 
 def get_parents_without_own_record(
@@ -52,18 +63,42 @@ def get_animals_are_own_parent(
     )
 
 
+def get_animals_in_circular_pedigree(
+    pedigree: pl.LazyFrame | pl.DataFrame,
+    pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+) -> pl.LazyFrame | pl.DataFrame:
+    """Returns records for animals that are their own ancestor
+
+    Adds a `cycle` column numbering the circular loop each animal is part of.
+    Strongly connected components of the sire/dam graph are found in linear time.
+    Animals that are only their own parent are found by `get_animals_are_own_parent`."""
+    animal = pedigree_labels[0]
+    records = pedigree.lazy().collect()
+    ids, animals, sires, dams = _encode_pedigree(records, pedigree_labels)
+    components = _circular_components(ids.len(), animals, sires, dams)
+    in_cycle = np.flatnonzero(components != -1)
+    cycles = pl.DataFrame(
+        {animal: ids.gather(in_cycle), "cycle": components[in_cycle]},
+        schema_overrides={"cycle": pl.UInt32},
+    )
+    circular = records.join(cycles, on=animal)
+    return circular.lazy() if isinstance(pedigree, pl.LazyFrame) else circular
+
+
 def get_animals_born_before_parents(
     pedigree: pl.LazyFrame | pl.DataFrame,
     pedigree_labels: tuple[str, str, str] = PedigreeLabels,
     age_label: str | None = None,
+    cache: PedigreeCache | None = None,
 ) -> pl.LazyFrame | pl.DataFrame:
     """Returns any animals that are used as a sire before they were born
 
     `age_label` is column in `pedigree` to use for age comparisons. For example
-    'birth_year' or 'generation'"""
+    'birth_year' or 'generation'. If None, generations are classified (reusing
+    them from `cache` if given)."""
     if age_label is None:
         pedigree = classify_generations(
-            pedigree, pedigree_labels=pedigree_labels
+            pedigree, pedigree_labels=pedigree_labels, cache=cache
         ).lazy()
         age_label = "generation"
 
@@ -138,13 +173,142 @@ def get_parent_sex_mismatches(
     return pl.concat(mismatches)
 
 
+def _get_record_errors(
+    pedigree: pl.LazyFrame,
+    pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    sex_label: str | None = None,
+    sex_codes: tuple[any, any] = SexIds,
+) -> dict[str, pl.LazyFrame]:
+    """Returns the record level errors of `validate_pedigree`, one check at a time"""
+    errors = {}
+    # records for parents with no own record
+    errors["missing records"] = get_missing_records(
+        pedigree, pedigree_labels=pedigree_labels
+    ).with_columns(pl.lit("has no own record").alias("error"))
+    errors["own parent"] = get_animals_are_own_parent(
+        pedigree, pedigree_labels=pedigree_labels
+    ).with_columns(pl.lit("is own parent").alias("error"))
+    errors["multiple records"] = get_animals_with_multiple_records(
+        pedigree, pedigree_labels=pedigree_labels
+    ).with_columns(pl.lit("has multiple own records").alias("error"))
+    errors["both sire and dam"] = pedigree.join(
+        get_parents_both_sires_and_dams(pedigree, parent_labels=pedigree_labels[1:3]),
+        left_on=pedigree_labels[0],
+        right_on="parent",
+    ).with_columns(pl.lit("is both sire and dam").alias("error"))
+    if sex_label:
+        errors["parent sex mismatches"] = get_parent_sex_mismatches(
+            pedigree,
+            pedigree_labels=pedigree_labels,
+            sex_label=sex_label,
+            sex_codes=sex_codes,
+        ).with_columns(pl.lit("wrong sex for parental role").alias("error"))
+    return errors
+
+
+def _get_fused_errors(
+    pedigree: pl.LazyFrame,
+    pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    age_label: str | None = None,
+    sex_label: str | None = None,
+    sex_codes: tuple[any, any] = SexIds,
+    columns: list[str] | None = None,
+) -> dict[str, pl.LazyFrame]:
+    """Returns the record level errors of `validate_pedigree` from shared joins
+
+    The pedigree is joined once to each parent's own record & every error class
+    needing parent information (missing records, born before parents, parent sex
+    mismatches & parents that are both sires and dams) is derived from those two
+    joins. Only `columns` (default all) of `pedigree` are returned in errors. Animals
+    born before their parents are only checked if `age_label` is given."""
+    animal, sire, dam = pedigree_labels
+    columns = columns or pedigree.collect_schema().names()
+    parent_record = pedigree.with_row_index("_row").select(
+        pl.all().name.suffix("_parent")
+    )
+    as_parent = [pl.col(f"{col}_parent").alias(col) for col in columns]
+    joined = {
+        parent: pedigree.join(
+            parent_record,
+            left_on=parent,
+            right_on=f"{animal}_parent",
+            how="left",
+            coalesce=False,
+        )
+        for parent in (sire, dam)
+    }
+    parent_ids = {
+        parent: parent_joined.filter(pl.col(parent).is_not_null())
+        .select(
+            pl.col(parent).alias("parent"),
+            pl.col(f"{animal}_parent").is_not_null().alias("has_record"),
+        )
+        .unique()
+        for parent, parent_joined in joined.items()
+    }
+
+    errors = {}
+    if age_label is not None:
+        for parent, parent_joined in joined.items():
+            errors[f"born before {parent}"] = (
+                parent_joined.filter(pl.col(age_label) <= pl.col(f"{age_label}_parent"))
+                .select(columns)
+                .with_columns(pl.lit(f"was born before {parent}").alias("error"))
+            )
+    errors["missing records"] = pl.concat(
+        ids.filter(~pl.col("has_record")).select("parent")
+        for ids in parent_ids.values()
+    ).select(
+        pl.col("parent").alias(animal),
+        *[
+            pl.lit(None).cast(dtype).alias(col)
+            for col, dtype in pedigree.select(columns).collect_schema().items()
+            if col != animal
+        ],
+        pl.lit("has no own record").alias("error"),
+    )
+    errors["own parent"] = get_animals_are_own_parent(
+        pedigree.select(columns), pedigree_labels=pedigree_labels
+    ).with_columns(pl.lit("is own parent").alias("error"))
+    errors["multiple records"] = get_animals_with_multiple_records(
+        pedigree.select(columns), pedigree_labels=pedigree_labels
+    ).with_columns(pl.lit("has multiple own records").alias("error"))
+    errors["both sire and dam"] = (
+        joined[sire]
+        .join(
+            parent_ids[sire].join(parent_ids[dam], on="parent", how="semi"),
+            left_on=sire,
+            right_on="parent",
+            how="semi",
+        )
+        .filter(pl.col(f"{animal}_parent").is_not_null())
+        .select(*as_parent, "_row_parent")
+        .unique()
+        .drop("_row_parent")
+        .with_columns(pl.lit("is both sire and dam").alias("error"))
+    )
+    if sex_label:
+        for (parent, parent_joined), sex in zip(joined.items(), sex_codes[:2]):
+            errors[f"{parent} sex mismatches"] = (
+                parent_joined.filter(pl.col(f"{sex_label}_parent") != sex)
+                .select(as_parent)
+                .unique()
+                .with_columns(pl.lit("wrong sex for parental role").alias("error"))
+            )
+    return errors
+
+
 def validate_pedigree(
     pedigree: pl.LazyFrame | pl.DataFrame,
     pedigree_labels: tuple[str, str, str] = PedigreeLabels,
     age_label: str | None = None,
     sex_label: str | None = None,
     sex_codes: tuple[any, any] | None = None,
-) -> tuple[bool, pl.DataFrame]:
+    path: str | Path | None = None,
+    fused: bool = False,
+    profiler: Profiler | None = None,
+    cache: PedigreeCache | None = None,
+) -> tuple[bool, pl.DataFrame | pl.LazyFrame]:
     """Validates a pedigree
 
     Checks for:
@@ -152,9 +316,28 @@ def validate_pedigree(
      * animals with multiple individual records
      * animals that occur as both sires & dams
      * animals that are their own parent
+     * animals that are their own ancestor (circular pedigree)
      * animals born before their parents (if `age_label` is None then
-       generations will be classified)
+       generations will be classified, excluding any circular pedigree)
      * animals with mis-matched sex and parent type (requires `sex_label`)
+
+    If `path` is given the pedigree is not loaded into memory. Instead the checks
+    run on the streaming engine and errors are written to a Parquet file at `path`,
+    so pedigrees larger than memory (e.g. from `pl.scan_parquet`) can be validated.
+    Errors are then returned as a LazyFrame scanning that file. Checks that need
+    the whole pedigree in memory (circular pedigree & classifying generations) are
+    skipped, so animals born before their parents are only found if `age_label`
+    is given.
+
+    If `fused` is True, the pedigree is joined once to the record of each parent
+    column & the errors needing parent information are all derived from those
+    joins, rather than each check joining the pedigree again. The same errors are
+    found, but may be in a different order.
+
+    If a `profiler` is given (see `pedpol.profiling.Profiler`), each check is
+    collected on its own rather than together, recording its wall time, number of
+    errors & optimized query plan. With `path` the checks are timed as one sink.
+    If a `cache` is given, classified generations are reused from it.
     """
     # Raise error if pedigree doesn't have 3 columns (animal, sire, dam)
     if missing_lbls := [
@@ -164,53 +347,263 @@ def validate_pedigree(
     ]:
         raise ValueError(f"Required column(s) {missing_lbls} not found in pedigree.")
 
-    pedigree = pedigree.lazy().collect().lazy()
-    errors = []
-    errors.append(
-        get_animals_born_before_parents(
-            pedigree, pedigree_labels=pedigree_labels, age_label=age_label
-        ).select(*pedigree.collect_schema().names(), "error")
-    )
-    errors.append(
-        get_missing_records(pedigree, pedigree_labels=pedigree_labels).with_columns(
-            pl.lit("has no own record").alias("error")
+    stage = "validate_pedigree"
+    errors = {}
+    if path is None:
+        with _timer(profiler, stage, "load"):
+            pedigree = pedigree.lazy().collect().lazy()
+        with _timer(profiler, stage, "circular pedigree"):
+            circular = get_animals_in_circular_pedigree(pedigree, pedigree_labels)
+        acyclic = pedigree
+        if age_label is None:
+            acyclic = pedigree.join(
+                circular.select(pedigree_labels[0]), on=pedigree_labels[0], how="anti"
+            )
+        errors["circular pedigree"] = circular.drop("cycle").with_columns(
+            pl.lit("is in circular pedigree").alias("error")
         )
-    )  # records for parents with no own record
-    errors.append(
-        get_animals_are_own_parent(
-            pedigree, pedigree_labels=pedigree_labels
-        ).with_columns(pl.lit("is own parent").alias("error"))
-    )
-    errors.append(
-        get_animals_with_multiple_records(
-            pedigree, pedigree_labels=pedigree_labels
-        ).with_columns(pl.lit("has multiple own records").alias("error"))
-    )
-    errors.append(
-        pedigree.join(
-            get_parents_both_sires_and_dams(
-                pedigree, parent_labels=pedigree_labels[1:3]
-            ),
-            left_on=pedigree_labels[0],
-            right_on="parent",
-        ).with_columns(pl.lit("is both sire and dam").alias("error"))
-    )
-    if sex_label:
-        errors.append(
-            get_parent_sex_mismatches(
+    else:
+        pedigree = acyclic = pedigree.lazy()
+
+    sex_codes = sex_codes or SexIds
+    if fused:
+        columns = pedigree.collect_schema().names()
+        if path is None and age_label is None:
+            generations = classify_generations(
+                acyclic, pedigree_labels, profiler, cache
+            )
+            pedigree = pedigree.drop("generation", strict=False).join(
+                generations.lazy().select(pedigree_labels[0], "generation").unique(),
+                on=pedigree_labels[0],
+                how="left",
+                maintain_order="left",
+            )
+            age_label = "generation"
+        errors.update(
+            _get_fused_errors(
                 pedigree,
-                pedigree_labels=pedigree_labels,
+                pedigree_labels,
+                age_label=age_label,
                 sex_label=sex_label,
                 sex_codes=sex_codes,
-            ).with_columns(pl.lit("wrong sex for parental role").alias("error"))
+                columns=columns,
+            )
+        )
+    else:
+        if path is None and age_label is None:
+            acyclic = classify_generations(
+                acyclic, pedigree_labels, profiler, cache
+            ).lazy()
+            age_label = "generation"
+        if age_label is not None:
+            errors = {
+                "born before parents": get_animals_born_before_parents(
+                    acyclic, pedigree_labels=pedigree_labels, age_label=age_label
+                ).select(*pedigree.collect_schema().names(), "error"),
+                **errors,
+            }
+        errors.update(
+            _get_record_errors(
+                pedigree,
+                pedigree_labels,
+                sex_label=sex_label,
+                sex_codes=sex_codes,
+            )
         )
 
-    errors = pl.concat(pl.collect_all(errors))
+    if path is not None:
+        query = pl.concat(errors.values())
+        with _timer(profiler, stage, "sink"):
+            query.sink_parquet(path)
+        errors = pl.scan_parquet(path)
+        return errors.select(pl.len()).collect().item() == 0, errors
+
+    if profiler is None:
+        errors = pl.concat(pl.collect_all(errors.values()))
+    else:
+        errors = pl.concat(
+            profiler.collect(stage, check, query) for check, query in errors.items()
+        )
     is_valid_pedigree = errors.height == 0
 
     return is_valid_pedigree, errors
 
 
+def _scan_summary(
+    summary: pl.LazyFrame | pl.DataFrame | str | Path,
+) -> pl.LazyFrame:
+    """Returns a pedigree summary, scanning it if given the path of a Parquet file"""
+    if isinstance(summary, (str, Path)):
+        return pl.scan_parquet(summary)
+    return summary.lazy()
+
+
+def summarize_pedigree(
+    pedigree: pl.LazyFrame | pl.DataFrame,
+    pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    age_label: str | None = None,
+    sex_label: str | None = None,
+    summary: pl.LazyFrame | pl.DataFrame | str | Path | None = None,
+) -> pl.LazyFrame | pl.DataFrame:
+    """Returns the per animal summary of a validated pedigree used by `validate_increment`
+
+    Has a row for each animal's own record with its `age_label` & `sex_label` (if
+    given) and whether the animal `is_sire` and/or `is_dam`. If the `summary` of a
+    base pedigree (or the path of a Parquet file it was written to) is given,
+    `pedigree` is treated as records appended to the base & the summary is extended.
+
+    ### Example use:
+    ```python
+    summarize_pedigree(ped_df, lbls, "birth_year").write_parquet("summary.parquet")
+    is_valid, errors = validate_increment("summary.parquet", new_df, lbls, "birth_year")
+    ```"""
+    animal, sire, dam = pedigree_labels
+    columns = [animal, *[label for label in (age_label, sex_label) if label]]
+    records = pedigree.lazy().select(columns)
+    roles = {"is_sire": sire, "is_dam": dam}
+    if summary is not None:
+        records = pl.concat(
+            [
+                _scan_summary(summary),
+                records.with_columns(pl.lit(False).alias(role) for role in roles),
+            ]
+        ).rename({role: f"{role}_base" for role in roles})
+    for role, parent in roles.items():
+        records = records.join(
+            pedigree.lazy()
+            .select(pl.col(parent).alias(animal))
+            .drop_nulls()
+            .unique()
+            .with_columns(pl.lit(True).alias(role)),
+            on=animal,
+            how="left",
+            maintain_order="left",
+        ).with_columns(pl.col(role).fill_null(False))
+        if summary is not None:
+            records = records.with_columns(pl.col(role) | pl.col(f"{role}_base")).drop(
+                f"{role}_base"
+            )
+    if isinstance(pedigree, pl.DataFrame):
+        return records.collect()
+    return records
+
+
+def validate_increment(
+    summary: pl.LazyFrame | pl.DataFrame | str | Path,
+    new_records: pl.LazyFrame | pl.DataFrame,
+    pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    age_label: str | None = None,
+    sex_label: str | None = None,
+    sex_codes: tuple[any, any] | None = None,
+) -> tuple[bool, pl.DataFrame]:
+    """Validates records appended to an already validated base pedigree
+
+    Uses the `summary` of the base pedigree from `summarize_pedigree` (or the path
+    of a Parquet file it was written to) rather than the base pedigree itself, so
+    only the new records & the summary rows of animals they refer to are read.
+    Runs the checks of `validate_pedigree` for the new records:
+     * parents without their own record in the base or new records
+     * animals with multiple records in the base and/or new records
+     * animals that occur as both sires & dams
+     * animals that are their own parent
+     * animals born before their parents (requires `age_label`, otherwise the new
+       records are checked for circular pedigree instead, as a valid base can't
+       refer to animals that are new)
+     * animals with mis-matched sex and parent type (requires `sex_label`)
+
+    Parents from the base are reported with only the columns kept in the summary.
+    """
+    animal, sire, dam = pedigree_labels
+    sex_codes = sex_codes or SexIds
+    new_records = new_records.lazy().collect()
+    columns = new_records.columns
+    base = (
+        _scan_summary(summary)
+        .join(
+            new_records.lazy().select(pedigree_ids(pedigree_labels)),
+            left_on=animal,
+            right_on="animal",
+            how="semi",
+        )
+        .collect()
+    )
+    records = pl.concat(
+        [new_records, base.select(col for col in base.columns if col in columns)],
+        how="diagonal_relaxed",
+    ).unique(animal, keep="first", maintain_order=True)
+
+    def records_of(ids: pl.Series, error: str) -> pl.DataFrame:
+        return records.join(
+            ids.alias(animal).to_frame(), on=animal, how="semi", maintain_order="left"
+        ).with_columns(pl.lit(error).alias("error"))
+
+    errors = [
+        get_missing_records(records, pedigree_labels).with_columns(
+            pl.lit("has no own record").alias("error")
+        ),
+        get_animals_are_own_parent(new_records, pedigree_labels).with_columns(
+            pl.lit("is own parent").alias("error")
+        ),
+        new_records.join(
+            base.select(animal, pl.lit(True).alias("_in_base")),
+            on=animal,
+            how="left",
+            maintain_order="left",
+        )
+        .filter(pl.col(animal).is_duplicated() | pl.col("_in_base").is_not_null())
+        .drop("_in_base")
+        .with_columns(pl.lit("has multiple own records").alias("error")),
+    ]
+
+    used_as = {
+        role: pl.concat(
+            [
+                new_records.get_column(parent).drop_nulls(),
+                base.filter(role).get_column(animal),
+            ]
+        )
+        for role, parent in (("is_sire", sire), ("is_dam", dam))
+    }
+    errors.append(
+        records_of(
+            used_as["is_sire"]
+            .to_frame(animal)
+            .join(used_as["is_dam"].to_frame(animal), on=animal, how="semi")
+            .get_column(animal),
+            "is both sire and dam",
+        )
+    )
+
+    for parent, sex in zip((sire, dam), sex_codes[:2]):
+        joined = new_records.join(
+            records, left_on=parent, right_on=animal, suffix="_parent"
+        )
+        if age_label is not None:
+            errors.append(
+                joined.filter(pl.col(age_label) <= pl.col(f"{age_label}_parent"))
+                .select(columns)
+                .with_columns(pl.lit(f"was born before {parent}").alias("error"))
+            )
+        if sex_label:
+            errors.append(
+                records_of(
+                    joined.filter(pl.col(f"{sex_label}_parent") != sex)
+                    .get_column(parent)
+                    .unique(),
+                    "wrong sex for parental role",
+                )
+            )
+    if age_label is None:
+        errors.append(
+            get_animals_in_circular_pedigree(new_records, pedigree_labels)
+            .drop("cycle")
+            .with_columns(pl.lit("is in circular pedigree").alias("error"))
+        )
+
+    errors = pl.concat(errors, how="diagonal_relaxed").select(*columns, "error")
+    return errors.height == 0, errors
+
+
 def get_missing_records(
     pedigree: pl.LazyFrame | pl.DataFrame,
     pedigree_labels: tuple[str, str, str] = PedigreeLabels,
@@ -262,45 +655,213 @@ def null_parents_without_own_record(
     )
 
 
+_UnsignedTypes = [pl.UInt8, pl.UInt16, pl.UInt32, pl.UInt64]
+
+
+def _narrowest_unsigned(max_value: int) -> pl.DataType:
+    """Returns the narrowest unsigned integer type that can hold `max_value`"""
+    for bits, dtype in zip((8, 16, 32), _UnsignedTypes):
+        if max_value < 2**bits:
+            return dtype
+    return pl.UInt64
+
+
+def _unsigned_id_map(id_map: pl.DataFrame) -> pl.DataFrame:
+    """Casts signed recoded ids (e.g. from a map written by other tools) to unsigned
+
+    Raises ValueError if recoded ids are not integers or any are negative."""
+    dtype = id_map.schema["recoded"]
+    if dtype in _UnsignedTypes:
+        return id_map
+    signed = [pl.Int8, pl.Int16, pl.Int32, pl.Int64]
+    if dtype not in signed:
+        raise ValueError(f"Recoded ids in the id map must be integers, not {dtype}.")
+    if (negative := id_map.filter(pl.col("recoded") < 0)).height != 0:
+        raise ValueError(
+            f"{negative.height} recoded ids in the id map are negative: \n {negative}"
+        )
+    return id_map.with_columns(
+        pl.col("recoded").cast(_UnsignedTypes[signed.index(dtype)])
+    )
+
+
+def read_id_map(path: str | Path) -> pl.DataFrame:
+    """Reads an id map saved with `write_id_map`
+
+    Parquet is used for a `.parquet` suffix, otherwise Arrow IPC."""
+    path = Path(path)
+    return pl.read_parquet(path) if path.suffix == ".parquet" else pl.read_ipc(path)
+
+
+def write_id_map(id_map: pl.LazyFrame | pl.DataFrame, path: str | Path) -> None:
+    """Saves an id map from `recode_pedigree` so later batches can extend it
+
+    Parquet is used for a `.parquet` suffix, otherwise Arrow IPC."""
+    path = Path(path)
+    id_map = id_map.lazy().collect()
+    if path.suffix == ".parquet":
+        id_map.write_parquet(path)
+    else:
+        id_map.write_ipc(path)
+
+
+def _apply_id_map(
+    pedigree: pl.DataFrame,
+    id_map: pl.DataFrame,
+    pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+) -> pl.DataFrame:
+    """Replaces the animal, sire & dam ids of `pedigree` with their recoded ids"""
+    animal, sire, dam = pedigree_labels
+    return pedigree.select(
+        *[
+            pl.col(label).replace_strict(
+                id_map.get_column(animal),
+                id_map.get_column("recoded"),
+                default=None,
+                return_dtype=id_map.schema["recoded"],
+            )
+            for label in pedigree_labels
+        ],
+        pl.all().exclude(animal, sire, dam),
+    )
+
+
 def recode_pedigree(
     pedigree: pl.LazyFrame | pl.DataFrame,
     pedigree_labels: tuple[str, str, str] = PedigreeLabels,
+    sort: bool = False,
+    age_label: str | None = None,
+    downcast: bool = False,
+    id_map: pl.LazyFrame | pl.DataFrame | str | Path | None = None,
+    cache: PedigreeCache | None = None,
+    unknown_parent_groups: pl.DataFrame | None = None,
 ) -> tuple[pl.LazyFrame | pl.DataFrame]:
     """Recodes a pedigree to use integer ids from 1 to the number of animals in the pedigree
 
-    Returns recoded pedigree & map of old id to recoded id."""
-    # If not all parents have their own record then raise ValueError
+    If `sort` is True, animals are numbered in order of `age_label` (or generation if
+    `age_label` is None) so that every parent has a lower id than its progeny. If
+    `downcast` is True, ids use the narrowest unsigned integer type that can hold
+    them rather than UInt32. Parent ids are mapped in a single dictionary-encoding
+    pass over each parent column.
+
+    If an existing `id_map` (or the path it was saved to with `write_id_map`) is
+    given, `pedigree` is treated as a batch of new records: animals already in the
+    map keep their id, unseen animals are numbered after the largest existing id &
+    parents may be either in the map or in the batch. Only the batch is recoded.
+
+    If `unknown_parent_groups` (from `assign_unknown_parent_groups`) are given, they
+    are numbered before any animal, so groups have the lowest ids.
+
+    If a `cache` is given (and no `id_map`), the map is reused whenever the same
+    pedigree is recoded again with the same options, skipping the checks below.
+
+    Returns recoded pedigree & map of old id to recoded id (extended by any new
+    animals if `id_map` was given)."""
     animal, sire, dam = pedigree_labels
+    is_lazy = isinstance(pedigree, pl.LazyFrame)
+    pedigree = pedigree.lazy().collect()
+    if isinstance(id_map, (str, Path)):
+        id_map = read_id_map(id_map)
+    elif id_map is not None:
+        id_map = id_map.lazy().collect()
+    if id_map is not None:
+        id_map = _unsigned_id_map(id_map)
+
+    cache_key = None
+    if cache is not None and id_map is None:
+        kind = "id_map" + "_sorted" * sort + "_downcast" * downcast
+        kind += "_groups" * (unknown_parent_groups is not None)
+        columns = (age_label,) if sort and age_label else ()
+        cache_key = kind, pedigree_fingerprint(pedigree, pedigree_labels, columns)
+        if (id_map := cache.get(*cache_key)) is not None:
+            new_pedigree = _apply_id_map(pedigree, id_map, pedigree_labels)
+            if sort:  # ids were numbered in sorted order
+                new_pedigree = new_pedigree.sort(animal)
+            if is_lazy:
+                return new_pedigree.lazy(), id_map.lazy()
+            return new_pedigree, id_map
+
+    # If not all parents have their own record then raise ValueError
+
     no_own_record = get_parents_without_own_record(pedigree, pedigree_labels)
+    if id_map is not None:
+        no_own_record = no_own_record.join(
+            id_map, left_on="parent", right_on=animal, how="anti"
+        )
+    if unknown_parent_groups is not None:
+        no_own_record = no_own_record.join(
+            unknown_parent_groups, left_on="parent", right_on=animal, how="anti"
+        )
     if (err_count := no_own_record.height) != 0:
         raise ValueError(
             f"{err_count} parents did not have their own record in the pedigree: \n {no_own_record}"
         )
-
-    id_map = pedigree.select(animal).with_row_index(name="recoded", offset=1)
-
-    new_pedigree = (
-        pedigree.join(id_map, on=animal, how="left", coalesce=False)
-        .join(
-            id_map,
-            left_on=sire,
-            right_on=animal,
-            how="left",
-            coalesce=False,
-            suffix="_sire",
+    multiple_records = get_animals_with_multiple_records(pedigree, pedigree_labels)
+    if (err_count := multiple_records.height) != 0:
+        raise ValueError(
+            f"{err_count} records are for animals with multiple records in the pedigree: \n {multiple_records}"
         )
-        .join(
-            id_map,
-            left_on=dam,
-            right_on=animal,
-            how="left",
-            coalesce=False,
-            suffix="_dam",
+
+    if sort:
+        if age_label is None:
+            order = classify_generations(pedigree, pedigree_labels, cache=cache)[
+                "generation"
+            ]
+        else:
+            order = pedigree[age_label]
+        pedigree = pedigree.sort(order, maintain_order=True)
+
+    new_ids = pedigree.select(animal)
+    if unknown_parent_groups is not None:
+        new_ids = pl.concat(
+            [
+                unknown_parent_groups.select(
+                    pl.col(animal).cast(new_ids.schema[animal])
+                ),
+                new_ids,
+            ]
         )
+    offset = 1
+    if id_map is not None:
+        new_ids = new_ids.join(id_map, on=animal, how="anti", maintain_order="left")
+        offset += id_map.get_column("recoded").max() or 0
+    max_id = offset - 1 + new_ids.height
+    dtype = _narrowest_unsigned(max_id if downcast else max(max_id, 2**16))
+    if id_map is not None and not downcast:
+        # Keep the existing map's type unless the new ids no longer fit in it
+        dtype = max(dtype, id_map.schema["recoded"], key=_UnsignedTypes.index)
+
+    new_map = new_ids.with_row_index(name="recoded", offset=offset).select(
+        animal, pl.col("recoded").cast(dtype)
     )
-    return new_pedigree.select(
-        pl.col("recoded").alias(animal),
-        pl.col("recoded_sire").alias(sire),
-        pl.col("recoded_dam").alias(dam),
-        pl.all().exclude(animal, sire, dam, "recoded", "recoded_sire", "recoded_dam"),
-    ), id_map
+    lookup = new_map
+    if id_map is not None:
+        id_map = id_map.select(animal, pl.col("recoded").cast(dtype))
+        lookup = pl.concat(
+            [
+                id_map.join(
+                    pedigree.select(pedigree_ids(pedigree_labels)),
+                    left_on=animal,
+                    right_on="animal",
+                    how="semi",
+                ),
+                new_map,
+            ]
+        )
+        new_map = pl.concat([id_map, new_map])
+    id_map = new_map.select("recoded", animal)
+
+    new_pedigree = _apply_id_map(pedigree, lookup, pedigree_labels)
+    if sort and (
+        err_count := new_pedigree.filter(
+            (pl.col(sire) >= pl.col(animal)) | (pl.col(dam) >= pl.col(animal))
+        ).height
+    ):
+        raise ValueError(
+            f"{err_count} animals could not be numbered after their parents using {age_label or 'generation'!r}."
+        )
+    if cache_key is not None:
+        cache.put(*cache_key, id_map)
+    if is_lazy:
+        return new_pedigree.lazy(), id_map.lazy()
+    return new_pedigree, id_map
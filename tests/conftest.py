@@ -6,6 +6,7 @@ import pytest
 
 from pedpol.core import null_unknown_parents
 from pedpol.generations import classify_generations
+from pedpol.index import PedigreeIndex
 from pedpol.validation import add_missing_records
 
 data_dir = Path(__file__).absolute().parent / "resources"
@@ -29,6 +30,19 @@ def ped_jv():
     return ped, (ped.columns)
 
 
+@pytest.fixture
+def ped_breed_jv():
+    """pedigree from Zhang et. al. 2009 with breeds of founders"""
+    ped = pl.read_csv(
+        data_dir / "ped_breed_jv.csv",
+        schema_overrides=3 * [pl.Int32] + [pl.Utf8],
+        comment_prefix="#",
+    ).pipe(
+        null_unknown_parents,
+    )
+    return ped, tuple(ped.columns[:3])
+
+
 @pytest.fixture
 def ped_circular():
     """cannot be correctly sorted
@@ -106,6 +120,12 @@ def ped_jv_classified(ped_jv):
 
 
 @pytest.fixture
-def ped_circular_classified(ped_circular):
-    ped, lbls = ped_circular
-    return classify_generations(ped, lbls), lbls
+def ped_jv_index(ped_jv):
+    ped, lbls = ped_jv
+    return PedigreeIndex.from_pedigree(ped, lbls)
+
+
+@pytest.fixture
+def ped_lit_index(ped_lit_valid):
+    ped, lbls = ped_lit_valid
+    return PedigreeIndex.from_pedigree(ped, lbls)
@@ -0,0 +1,68 @@
+import polars as pl
+import pytest
+
+from pedpol.breeds import compute_breed_composition
+
+
+def test_compute_breed_composition(ped_breed_jv):
+    ped, lbls = ped_breed_jv
+    result = compute_breed_composition(ped, lbls)
+    assert result.columns == [
+        *ped.columns,
+        "breed_AY",
+        "breed_HF",
+        "breed_JE",
+        "breed_unknown",
+    ]
+    assert result.get_column(lbls[0]).to_list() == ped.get_column(lbls[0]).to_list()
+    composition = {
+        row[0]: row[1:]
+        for row in result.select(
+            lbls[0], "breed_AY", "breed_HF", "breed_JE", "breed_unknown"
+        ).iter_rows()
+    }
+    assert composition[3] == (0, 1, 0, 0)
+    assert composition[13] == (0, 0, 0, 1)
+    assert composition[4] == (0, 0.5, 0.5, 0)
+    assert composition[1] == (0, 0.75, 0.25, 0)
+    # sire 11 is half HF, half JE & dam 13 has no breed
+    assert composition[2] == (0, 0.25, 0.25, 0.5)
+    # sire 14 is AY & dam 15 half HF, half JE
+    assert composition[6] == (0.25, 0.25, 0.25, 0.25)
+    # every animal's composition sums to 1
+    assert result.select(
+        pl.sum_horizontal("breed_AY", "breed_HF", "breed_JE", "breed_unknown")
+    ).to_series().to_list() == pytest.approx([1.0] * ped.height)
+
+
+def test_compute_breed_composition_unknown_parents(ped_breed_jv):
+    ped, lbls = ped_breed_jv
+    ped = ped.with_columns(
+        pl.when(pl.col(lbls[0]) == 4)
+        .then(None)
+        .otherwise(pl.col(lbls[2]))
+        .alias(lbls[2])
+    )
+    result = compute_breed_composition(ped, lbls).filter(pl.col(lbls[0]) == 4)
+    assert result.select("breed_HF", "breed_JE", "breed_unknown").row(0) == (
+        0.5,
+        0,
+        0.5,
+    )
+
+    # unknown genes can be counted as one of the breeds
+    result = compute_breed_composition(ped.lazy(), lbls, unknown_breed="JE").collect()
+    assert result.columns == [*ped.columns, "breed_AY", "breed_HF", "breed_JE"]
+    assert result.filter(pl.col(lbls[0]).is_in([4, 13])).select(
+        "breed_HF", "breed_JE"
+    ).rows() == [
+        (0.5, 0.5),
+        (0, 1),
+    ]
+
+
+def test_compute_breed_composition_column_clash(ped_breed_jv):
+    ped, lbls = ped_breed_jv
+    ped = ped.with_columns(pl.lit(0.0).alias("breed_HF"))
+    with pytest.raises(ValueError, match="breed_HF"):
+        compute_breed_composition(ped, lbls)
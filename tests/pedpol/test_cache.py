@@ -0,0 +1,76 @@
+import numpy as np
+import polars as pl
+import pytest
+
+from pedpol.cache import PedigreeCache, pedigree_fingerprint
+from pedpol.generations import classify_generations
+from pedpol.index import PedigreeIndex
+from pedpol.validation import recode_pedigree
+
+
+def test_fingerprint(ped_jv):
+    ped, lbls = ped_jv
+    fingerprint = pedigree_fingerprint(ped, lbls)
+    assert fingerprint == pedigree_fingerprint(ped.lazy(), lbls)
+    assert fingerprint == pedigree_fingerprint(ped.with_columns(x=1), lbls)
+    assert fingerprint != pedigree_fingerprint(ped.reverse(), lbls)
+    assert fingerprint != pedigree_fingerprint(
+        ped.with_columns(pl.col(lbls[1]).shift()), lbls
+    )
+
+
+def test_cached_generations(ped_jv):
+    ped, lbls = ped_jv
+    cache = PedigreeCache()
+    generations = classify_generations(ped, lbls, cache=cache)
+    assert generations.equals(classify_generations(ped, lbls))
+    assert ("generations", pedigree_fingerprint(ped, lbls)) in cache
+    # a cached result is returned without classifying again
+    cache.put(
+        "generations",
+        pedigree_fingerprint(ped, lbls),
+        pl.DataFrame({"generation": range(15)}),
+    )
+    assert classify_generations(ped, lbls, cache=cache)["generation"].to_list() == list(
+        range(15)
+    )
+
+
+@pytest.mark.parametrize("sort", [False, True])
+def test_cached_id_map(ped_jv, sort):
+    ped, lbls = ped_jv
+    cache = PedigreeCache()
+    recoded, id_map = recode_pedigree(ped, lbls, sort=sort, cache=cache)
+    assert len(cache) == 1 + sort  # generations are cached when sorting
+    cached, cached_map = recode_pedigree(ped, lbls, sort=sort, cache=cache)
+    assert cached.equals(recoded)
+    assert cached_map.equals(id_map)
+
+
+def test_cached_index_on_disk(ped_lit_valid, tmp_path):
+    ped, lbls = ped_lit_valid
+    index = PedigreeIndex.from_pedigree(
+        ped, lbls, cache=PedigreeCache(directory=tmp_path)
+    )
+    assert len(list(tmp_path.glob("index-*.parquet"))) == 1
+    loaded = PedigreeIndex.from_pedigree(
+        ped, lbls, cache=PedigreeCache(directory=tmp_path)
+    )
+    assert loaded is not index
+    assert loaded.ids.equals(index.ids)
+    assert np.array_equal(loaded.progeny, index.progeny)
+    assert np.array_equal(loaded.generations(), index.generations())
+
+
+def test_cache_evicts_least_recently_used():
+    frame = pl.DataFrame({"x": np.arange(100)})
+    cache = PedigreeCache(max_bytes=2 * frame.estimated_size())
+    cache.put("a", "1", frame)
+    cache.put("a", "2", frame)
+    cache.get("a", "1")
+    cache.put("a", "3", frame)
+    assert ("a", "1") in cache
+    assert ("a", "2") not in cache
+    assert cache.nbytes == 2 * frame.estimated_size()
+    cache.put("a", "4", pl.concat([frame] * 3))  # too large to hold
+    assert len(cache) == 2
@@ -0,0 +1,80 @@
+import polars as pl
+import pytest
+
+from pedpol.completeness import compute_completeness
+
+
+def ancestors_by_generation(ped: pl.DataFrame, lbls, animal, depth: int) -> list:
+    """Known ancestors of `animal` in each generation back, repeating as in a tree"""
+    parents = {a: (s, d) for a, s, d in ped.select(lbls).iter_rows()}
+    known, generation = [], [animal]
+    for _ in range(depth):
+        generation = [
+            p for a in generation if a is not None for p in parents.get(a, (None, None))
+        ]
+        known.append([p for p in generation if p is not None])
+    return known
+
+
+def expected_completeness(ped: pl.DataFrame, lbls, animal, generations: int = 5):
+    known = ancestors_by_generation(ped, lbls, animal, 20)
+    counts = [len(k) for k in known]
+    complete = next(n for n, count in enumerate(counts) if count < 2 ** (n + 1))
+    maximum = max((n + 1 for n, count in enumerate(counts) if count), default=0)
+    equivalent = sum(count / 2 ** (n + 1) for n, count in enumerate(counts))
+
+    lines = []
+    for parent in ped.filter(pl.col(lbls[0]) == animal).select(lbls[1:]).row(0):
+        if parent is None:
+            lines.append(0)
+            continue
+        line = [1] + [
+            len(k) / 2 ** (n + 1)
+            for n, k in enumerate(
+                ancestors_by_generation(ped, lbls, parent, generations - 1)
+            )
+        ]
+        lines.append(sum(line) / generations)
+    pci = 2 * lines[0] * lines[1] / sum(lines) if all(lines) else 0
+    return pci, complete, maximum, equivalent
+
+
+@pytest.mark.parametrize("generations", [1, 3, 5])
+def test_completeness(ped_jv, generations):
+    ped, lbls = ped_jv
+    ped = ped.with_columns(
+        pl.when(pl.col(lbls[0]) == 5)
+        .then(None)
+        .otherwise(pl.col(lbls[2]))
+        .alias(lbls[2])
+    )
+    completeness = compute_completeness(ped, lbls, generations)
+    assert completeness.get_column(lbls[0]).equals(ped.get_column(lbls[0]))
+    for row in completeness.iter_rows(named=True):
+        expected = expected_completeness(ped, lbls, row[lbls[0]], generations)
+        assert (
+            row["pci"],
+            row["complete_generations"],
+            row["max_generations"],
+            row["equivalent_generations"],
+        ) == pytest.approx(expected)
+
+
+def test_completeness_of_known_animal(ped_jv):
+    ped, lbls = ped_jv
+    completeness = compute_completeness(ped.lazy(), lbls).collect()
+    assert completeness.schema["complete_generations"] == pl.Int32
+    assert completeness.filter(pl.col(lbls[0]) == 7).select(
+        "complete_generations", "max_generations"
+    ).row(0) == (3, 4)
+    founders = completeness.filter(pl.col(lbls[1]).is_null())
+    assert founders.select(pl.exclude(lbls).sum()).row(0) == (0, 0, 0, 0)
+
+
+def test_completeness_of_parents_without_records(ped_lit):
+    ped, lbls = ped_lit
+    completeness = compute_completeness(ped, lbls)
+    assert completeness.height == ped.height
+    assert completeness.filter(pl.col(lbls[0]) == "Harry").row(0, named=True)[
+        "equivalent_generations"
+    ] == pytest.approx(1)
@@ -0,0 +1,121 @@
+import polars as pl
+import pytest
+
+from pedpol.contributions import (
+    compute_genetic_conservation_index,
+    effective_number,
+    get_ancestor_contributions,
+    get_founder_contributions,
+)
+from pedpol.generations import classify_generations
+from pedpol.simulate import simulate_pedigree
+
+
+def founder_genes(ped: pl.DataFrame, lbls) -> dict:
+    """Fraction of each animal's genes from each founder (or unknown parent)"""
+    animal, sire, dam = lbls
+    genes = {}
+    for row in classify_generations(ped, lbls).sort("generation").iter_rows(named=True):
+        genes[row[animal]] = {}
+        for parent in (sire, dam):
+            parent_genes = genes.get(row[parent])
+            if row[sire] is None and row[dam] is None:
+                parent_genes = {(row[animal], None): 1.0}
+            elif parent_genes is None:
+                parent_genes = {(row[animal], parent): 1.0}
+            for founder, fraction in parent_genes.items():
+                genes[row[animal]][founder] = (
+                    genes[row[animal]].get(founder, 0) + fraction / 2
+                )
+    return genes
+
+
+@pytest.fixture
+def ped_jv_half_founder(ped_jv):
+    ped, lbls = ped_jv
+    ped = ped.with_columns(
+        pl.when(pl.col(lbls[0]) == 5)
+        .then(None)
+        .otherwise(pl.col(lbls[2]))
+        .alias(lbls[2])
+    )
+    return ped, lbls
+
+
+@pytest.mark.parametrize("reference", [None, [1, 2, 7], [7]])
+def test_founder_contributions(ped_jv_half_founder, reference):
+    ped, lbls = ped_jv_half_founder
+    genes = founder_genes(ped, lbls)
+    reference_ids = reference or ped.get_column(lbls[0]).to_list()
+    expected = {}
+    for animal in reference_ids:
+        for founder, fraction in genes[animal].items():
+            expected[founder] = expected.get(founder, 0) + fraction / len(reference_ids)
+
+    founders = get_founder_contributions(ped, reference, lbls)
+    assert founders.get_column("contribution").sum() == pytest.approx(1)
+    assert founders.get_column("contribution").is_sorted(descending=True)
+    found = {(a, p): c for a, p, c in founders.iter_rows()}
+    assert found == pytest.approx(expected)
+
+
+def test_founder_contributions_with_half_founder(ped_jv_half_founder):
+    ped, lbls = ped_jv_half_founder
+    founders = get_founder_contributions(ped, [5], lbls)
+    assert sorted(founders.rows()) == [(5, "dam", 0.5), (14, None, 0.5)]
+    assert effective_number(founders["contribution"]) == pytest.approx(2)
+
+
+def test_ancestor_contributions(ped_jv):
+    ped, lbls = ped_jv
+    ancestors = get_ancestor_contributions(ped, [7], lbls)
+    assert ancestors.rows() == [(6, None, 0.5), (8, None, 0.5)]
+    ancestors = get_ancestor_contributions(ped, [1, 2, 7], lbls)
+    assert ancestors.get_column(lbls[0]).to_list() == [1, 2, 6]
+    assert ancestors.get_column("contribution").to_list() == pytest.approx(
+        [5 / 12, 5 / 12, 1 / 6]
+    )
+
+
+def test_effective_ancestors_no_more_than_founders(ped_lit_valid):
+    ped, lbls = ped_lit_valid
+    reference = ["Barry", "Scott", "Kristi", "Helen", "Nader"]
+    fe = effective_number(
+        get_founder_contributions(ped, reference, lbls)["contribution"]
+    )
+    ancestors = get_ancestor_contributions(ped, reference, lbls)
+    assert ancestors.get_column("contribution").sum() <= 1 + 1e-12
+    assert ancestors.get_column("contribution").is_sorted(descending=True)
+    assert effective_number(ancestors["contribution"]) <= fe
+    assert get_ancestor_contributions(ped, reference, lbls, max_ancestors=2).height == 2
+
+
+def test_ancestor_contributions_with_half_founder(ped_jv_half_founder):
+    ped, lbls = ped_jv_half_founder
+    ancestors = get_ancestor_contributions(ped, [5], lbls)
+    assert sorted(ancestors.rows()) == [(5, "dam", 0.5), (14, None, 0.5)]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_ancestor_contributions_with_unknown_parents(seed):
+    ped = simulate_pedigree(2000, n_generations=6, unknown_rate=0.3, seed=seed)
+    reference = ped.filter(pl.col("birth_year") == pl.col("birth_year").max())
+    reference = reference.get_column("animal")
+    founders = get_founder_contributions(ped, reference)
+    ancestors = get_ancestor_contributions(ped, reference, max_ancestors=10_000)
+    assert ancestors.get_column("contribution").sum() == pytest.approx(1)
+    assert effective_number(ancestors["contribution"]) <= effective_number(
+        founders["contribution"]
+    ) * (1 + 1e-9)
+
+
+def test_genetic_conservation_index(ped_jv_half_founder):
+    ped, lbls = ped_jv_half_founder
+    genes = founder_genes(ped, lbls)
+    gci = compute_genetic_conservation_index(ped.lazy(), lbls).collect()
+    assert gci.get_column(lbls[0]).equals(ped.get_column(lbls[0]))
+    expected = [
+        1 / sum(f**2 for f in genes[a].values()) for a in ped.get_column(lbls[0])
+    ]
+    assert gci.get_column("gci").to_list() == pytest.approx(expected)
+    assert gci.filter(pl.col(lbls[0]) == 1)["gci"].item() == pytest.approx(8 / 3)
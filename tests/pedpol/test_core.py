@@ -0,0 +1,70 @@
+import polars as pl
+import pytest
+
+from pedpol.core import assign_unknown_parent_groups
+
+
+def test_assign_unknown_parent_groups(ped_breed_jv):
+    ped, lbls = ped_breed_jv
+    animal, sire, dam = lbls
+    ped = ped.with_columns(pl.col(dam).replace(1, None))  # animal 8 has only a sire
+    grouped, groups = assign_unknown_parent_groups(ped, ["breed"], lbls)
+    assert grouped.columns == ped.columns
+    assert grouped.get_column(animal).equals(ped.get_column(animal))
+    assert grouped.select(sire, dam).null_count().sum_horizontal().item() == 0
+    assert groups.rows() == [
+        (-1, sire, "AY"),
+        (-2, sire, "HF"),
+        (-3, sire, "JE"),
+        (-4, sire, None),
+        (-5, dam, "AY"),
+        (-6, dam, "HF"),
+        (-7, dam, "JE"),
+        (-8, dam, None),
+    ]
+    parents = {row[0]: row[1:] for row in grouped.select(lbls).iter_rows()}
+    assert parents[3] == parents[12] == (-2, -6)
+    assert parents[13] == (-4, -8)
+    assert parents[8] == (2, -8)
+    assert parents[4] == (3, 9)
+
+
+def test_assign_unknown_parent_groups_by_expression(ped_lit):
+    ped, lbls = ped_lit
+    animal, sire, dam = lbls
+    grouped, groups = assign_unknown_parent_groups(
+        ped.lazy(), [pl.col(animal).str.head(1).alias("initial")], lbls
+    )
+    grouped = grouped.collect()
+    assert groups.columns == [animal, "parent", "initial"]
+    assert groups.get_column(animal).str.starts_with("UPG").all()
+    assert grouped.select(sire, dam).null_count().sum_horizontal().item() == 0
+    assert (
+        grouped.join(groups, left_on=sire, right_on=animal)
+        .select(pl.col(animal).str.head(1) == pl.col("initial"))
+        .to_series()
+        .all()
+    )
+
+
+def test_assign_unknown_parent_groups_with_unsigned_ids(ped_breed_jv):
+    ped, lbls = ped_breed_jv
+    ped = ped.cast({lbl: pl.UInt32 for lbl in lbls})
+    with pytest.raises(ValueError, match="unsigned"):
+        assign_unknown_parent_groups(ped, ["breed"], lbls)
+
+
+def test_assign_unknown_parent_groups_with_int8_ids(ped_breed_jv):
+    ped, lbls = ped_breed_jv
+    ped = ped.cast({lbl: pl.Int8 for lbl in lbls})
+    grouped, groups = assign_unknown_parent_groups(ped, ["breed"], lbls)
+    assert groups.schema[lbls[0]] == pl.Int8
+    assert groups.get_column(lbls[0]).to_list() == list(range(-1, -9, -1))
+    assert grouped.schema == ped.schema
+
+
+def test_assign_unknown_parent_groups_with_clashing_ids(ped_lit):
+    ped, lbls = ped_lit
+    ped = ped.with_columns(pl.col(lbls[0]).replace(ped.item(0, lbls[0]), "UPG1"))
+    with pytest.raises(ValueError, match="already animal Ids"):
+        assign_unknown_parent_groups(ped, [pl.lit(1).alias("all")], lbls)
@@ -0,0 +1,48 @@
+import numpy as np
+import polars as pl
+import pytest
+
+from pedpol.export import write_solver_pedigree
+from pedpol.relationships import compute_inbreeding
+from pedpol.validation import recode_pedigree
+
+
+@pytest.fixture
+def recoded_jv(ped_jv):
+    ped, lbls = ped_jv
+    recoded, _ = recode_pedigree(ped, lbls, sort=True)
+    return compute_inbreeding(recoded, lbls), lbls
+
+
+def test_write_solver_pedigree_as_text(recoded_jv, tmp_path):
+    ped, lbls = recoded_jv
+    write_solver_pedigree(
+        ped.lazy(), path := tmp_path / "ped.txt", lbls, ("inbreeding",)
+    )
+    lines = path.read_text().splitlines()
+    assert len(lines) == ped.height
+    assert lines[0] == "1 0 0 0.0"
+    written = pl.read_csv(
+        path, separator=" ", has_header=False, new_columns=[*lbls, "inbreeding"]
+    )
+    assert written.equals(ped.fill_null(0).cast(written.schema))
+
+
+@pytest.mark.parametrize("chunk_size", [4, 2**20])
+def test_write_solver_pedigree_as_binary(recoded_jv, tmp_path, chunk_size):
+    ped, lbls = recoded_jv
+    write_solver_pedigree(
+        ped, path := tmp_path / "ped.bin", lbls, ("inbreeding",), True, chunk_size
+    )
+    dtype = [(label, "<i4") for label in lbls] + [("inbreeding", "<f4")]
+    records = np.memmap(path, dtype=dtype, mode="r")
+    assert records.size == ped.height
+    for label in lbls:
+        assert records[label].tolist() == ped[label].fill_null(0).to_list()
+    assert records["inbreeding"] == pytest.approx(ped["inbreeding"].to_numpy())
+
+
+def test_write_solver_pedigree_of_literal_ids(ped_lit, tmp_path):
+    ped, lbls = ped_lit
+    with pytest.raises(ValueError, match="use `recode_pedigree` first"):
+        write_solver_pedigree(ped, tmp_path / "ped.txt", lbls)
@@ -1,10 +1,18 @@
+import polars as pl
+import pytest
+
 from pedpol.generations import (
     classify_generations,
+    count_relatives,
     get_ancestors_of,
+    get_ancestors_of_queries,
     get_descendants_of,
+    get_descendants_of_queries,
     get_parents_of,
     get_progeny_of,
+    prune_pedigree,
 )
+from pedpol.simulate import simulate_pedigree
 
 
 def test_generation_classification_of_valid_pedigree(ped_jv_classified):
@@ -20,10 +28,26 @@ def test_generation_classification_of_valid_pedigree_direct(ped_jv):
     ).get_column("count").to_list() == [2, 6, 4, 2, 1]
 
 
-def test_generation_classification_of_invalid_pedigree(ped_circular_classified):
-    assert ped_circular_classified[0].get_column("generation").value_counts().sort(
-        by="generation"
-    ).get_column("count").to_list() == [9, 1]
+def test_generation_classification_of_invalid_pedigree(ped_circular):
+    with pytest.raises(
+        ValueError, match=r"animals \[4, 7, 9\] are their own ancestors"
+    ):
+        classify_generations(*ped_circular)
+
+
+def test_generation_classification_ignores_own_parent(ped_errors):
+    ped = classify_generations(*ped_errors)
+    assert ped.filter(anim=5).get_column("generation").to_list() == [2, 2]
+
+
+def test_generation_classification_of_deep_pedigree():
+    ped = pl.DataFrame(
+        {"animal": range(1, 101), "sire": [None, *range(1, 100)], "dam": None},
+        schema_overrides={"dam": pl.Int64},
+    )
+    assert classify_generations(ped).get_column("generation").to_list() == list(
+        range(100)
+    )
 
 
 def test_get_progeny_of_single_id(ped_jv):
@@ -101,3 +125,251 @@ def test_get_descendents_of_multiple_ids_when_include_ids_false(ped_jv):
     assert get_descendants_of(
         ped, ids, include_ids=False, pedigree_labels=lbls
     ).height == (8 - len(ids))
+
+
+def test_indexed_get_progeny_of_single_id(ped_jv, ped_jv_index):
+    ped, lbls = ped_jv
+    progeny = get_progeny_of(ped, [3], pedigree_labels=lbls, index=ped_jv_index)
+    assert progeny.collect().height == 3
+
+
+def test_indexed_get_parents_of_multiple_ids(ped_jv, ped_jv_index):
+    ped, lbls = ped_jv
+    prnts = get_parents_of(ped, [11, 15], pedigree_labels=lbls, index=ped_jv_index)
+    assert prnts.collect().height == 2
+
+
+def test_indexed_get_ancestors_same_as_unindexed(ped_lit_valid, ped_lit_index):
+    ped, lbls = ped_lit_valid
+    ids = ["Barry", "Emily"]
+    for generations in (1, 2, 100):
+        assert (
+            get_ancestors_of(
+                ped,
+                ids,
+                generations=generations,
+                pedigree_labels=lbls,
+                index=ped_lit_index,
+            )
+            .sort(lbls[0])
+            .equals(
+                get_ancestors_of(
+                    ped, ids, generations=generations, pedigree_labels=lbls
+                ).sort(lbls[0])
+            )
+        )
+
+
+def test_lazy_indexed_get_descendants_of_multiple_ids(ped_jv, ped_jv_index):
+    ped, lbls = ped_jv
+    descendants = get_descendants_of(
+        ped.lazy(),
+        [11, 15],
+        include_ids=False,
+        pedigree_labels=lbls,
+        index=ped_jv_index,
+    )
+    assert descendants.collect().height == 6
+
+
+@pytest.fixture
+def lit_queries():
+    return pl.DataFrame(
+        {
+            "team": ["A", "A", "B", "C", "C", "D"],
+            "Child": ["Barry", "Emily", "Barry", "Harry", "Nobody", "Tom"],
+        }
+    )
+
+
+@pytest.mark.parametrize("include_ids", [True, False])
+@pytest.mark.parametrize("generations", [1, 100])
+def test_get_ancestors_of_queries_same_as_each_query(
+    ped_lit_valid, lit_queries, include_ids, generations
+):
+    ped, lbls = ped_lit_valid
+    ancestors = get_ancestors_of_queries(
+        ped,
+        lit_queries,
+        generations=generations,
+        include_ids=include_ids,
+        pedigree_labels=lbls,
+        query_label="team",
+    )
+    for (team,), ids in lit_queries.group_by("team"):
+        assert ancestors.filter(team=team).get_column("relative").sort().to_list() == (
+            get_ancestors_of(
+                ped,
+                ids.get_column("Child"),
+                generations=generations,
+                include_ids=include_ids,
+                pedigree_labels=lbls,
+            )
+            .get_column("Child")
+            .sort()
+            .to_list()
+        )
+
+
+def test_get_descendants_of_queries(ped_jv, ped_jv_index):
+    ped, lbls = ped_jv
+    queries = pl.DataFrame({"query_id": [1, 1, 2], lbls[0]: [11, 15, 3]})
+    descendants = get_descendants_of_queries(
+        ped, queries, include_ids=False, pedigree_labels=lbls, index=ped_jv_index
+    )
+    assert descendants.group_by("query_id").len().sort("query_id").get_column(
+        "len"
+    ).to_list() == [6, 10]
+
+
+def test_get_ancestors_of_with_depth_and_paths(ped_basic):
+    lbls = ("Anim", "Sire", "Dam")
+    ancestors = get_ancestors_of(
+        ped_basic, [8], pedigree_labels=lbls, depth_label="depth", paths_label="paths"
+    ).sort("Anim")
+    assert ancestors.get_column("depth").to_list() == [3, 3, 2, 2, 2, 1, 1, 0]
+    assert ancestors.get_column("paths").to_list() == [4, 5, 2, 2, 1, 1, 1, 1]
+
+
+def test_get_ancestors_of_with_paths_within_generations(ped_basic):
+    lbls = ("Anim", "Sire", "Dam")
+    ancestors = get_ancestors_of(
+        ped_basic.lazy(),
+        [8, 6],
+        generations=2,
+        include_ids=False,
+        pedigree_labels=lbls,
+        depth_label="depth",
+        paths_label="paths",
+    ).collect()
+    assert ancestors.sort("Anim").rows() == [
+        (1, None, None, 2, 1),
+        (2, None, None, 2, 2),
+        (3, 1, 2, 2, 2),
+        (4, 1, 2, 1, 3),
+        (5, 3, 2, 1, 2),
+        (6, 5, 4, 1, 1),
+        (7, 3, 4, 1, 1),
+    ]
+
+
+def test_get_ancestors_of_with_too_many_paths():
+    # every animal is the progeny of both animals of the previous generation, so
+    # the number of paths to the founders doubles each generation
+    generations = 70
+    animal = list(range(2 * generations))
+    sires = [None, None] + [2 * (a // 2 - 1) for a in animal[2:]]
+    ped = pl.DataFrame({"animal": animal, "sire": sires}).with_columns(
+        dam=pl.col("sire") + 1
+    )
+    ancestors = get_ancestors_of(ped, [2 * 60], generations=60, paths_label="paths")
+    assert ancestors.get_column("paths").max() == 2**59
+    with pytest.raises(ValueError, match="exceed the Int64 range"):
+        get_ancestors_of(ped, [2 * (generations - 1)], paths_label="paths")
+
+
+def test_get_descendants_of_with_depth(ped_basic, ped_jv):
+    lbls = ("Anim", "Sire", "Dam")
+    descendants = get_descendants_of(
+        ped_basic, [1], pedigree_labels=lbls, depth_label="depth", paths_label="paths"
+    ).sort("Anim")
+    assert descendants.get_column("depth").to_list() == [0, 1, 1, 2, 2, 2, 3]
+    assert descendants.get_column("paths").to_list() == [1, 1, 1, 1, 2, 2, 4]
+    ped, lbls = ped_jv
+    assert (
+        get_descendants_of(ped, [3], pedigree_labels=lbls, depth_label="depth").height
+        == get_descendants_of(ped, [3], pedigree_labels=lbls).height
+    )
+
+
+def test_prune_pedigree(ped_jv, ped_jv_index):
+    ped, lbls = ped_jv
+    animal = lbls[0]
+    for index in (None, ped_jv_index):
+        pruned = prune_pedigree(ped, [7], lbls, index=index)
+        # founders 12 & 14 have a single progeny
+        assert pruned.get_column(animal).to_list() == [
+            1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 13, 15
+        ]  # fmt: skip
+        parents = {row[0]: row[1:] for row in pruned.iter_rows()}
+        assert parents[1] == (4, None)
+        assert parents[5] == (None, 15)
+        assert parents[2] == (11, 13)
+
+    pruned = prune_pedigree(ped.lazy(), [1, 2], lbls).collect()
+    assert pruned.get_column(animal).to_list() == [1, 2, 3, 4, 9, 11]
+    assert pruned.filter(pl.col(animal) == 2).row(0) == (2, 11, None)
+
+    # 15 is only a founder with a single progeny once 3 & 9 are removed
+    assert prune_pedigree(ped, [5], lbls).rows() == [(5, None, None)]
+
+
+def test_prune_pedigree_adds_missing_records(ped_jv):
+    ped, lbls = ped_jv
+    animal = lbls[0]
+    ped = ped.filter(pl.col(animal) != 9)
+    pruned = prune_pedigree(ped, [4, 11], lbls)
+    assert pruned.rows() == [(9, None, None), (3, None, None), (4, 3, 9), (11, 3, 9)]
+
+
+def test_count_relatives(ped_jv):
+    ped, lbls = ped_jv
+    animal = lbls[0]
+    counts = count_relatives(ped, lbls)
+    assert counts.get_column(animal).equals(ped.get_column(animal))
+    counts = {row[0]: row[3:] for row in counts.iter_rows()}
+    assert counts[3] == (3, 0, 3, 4, 10)
+    assert counts[9] == (0, 3, 3, 4, 10)
+    assert counts[11] == (2, 0, 2, 2, 5)
+    assert counts[7] == (0, 0, 0, 0, 0)
+    for parent in (3, 11, 14):
+        descendants = get_descendants_of(
+            ped, [parent], include_ids=False, pedigree_labels=lbls
+        )
+        assert counts[parent][-1] == descendants.height
+
+
+def test_count_relatives_of_simulated_pedigree():
+    ped = simulate_pedigree(2000, n_generations=8, unknown_rate=0.2, seed=5)
+    counts = count_relatives(ped)
+    descendants = (
+        get_descendants_of_queries(
+            ped, ped.select(pl.col("animal").alias("query_id"), "animal"), 100, False
+        )
+        .group_by("query_id")
+        .len()
+    )
+    expected = counts.select("animal").join(
+        descendants,
+        left_on="animal",
+        right_on="query_id",
+        how="left",
+        maintain_order="left",
+    )
+    assert (
+        counts.get_column("n_descendants").to_list()
+        == expected.get_column("len").fill_null(0).to_list()
+    )
+
+
+@pytest.mark.parametrize("sketch_size", [4, 64])
+def test_count_relatives_with_sketches(ped_jv, sketch_size):
+    ped, lbls = ped_jv
+    exact = count_relatives(ped, lbls)
+    sketched = count_relatives(ped.lazy(), lbls, sketch_size=sketch_size).collect()
+    assert sketched.drop("n_descendants").equals(exact.drop("n_descendants"))
+    small = exact.get_column("n_descendants") < sketch_size
+    assert sketched.filter(small).equals(exact.filter(small))
+    if sketch_size == 4:
+        assert not small.all()
+
+
+def test_count_relatives_with_sketches_of_many_progeny():
+    # 32 bit random hashes of 200k progeny would almost surely collide
+    n = 200_000
+    ped = pl.DataFrame(
+        {"animal": range(n + 1), "sire": [None] + [0] * n, "dam": [None] * (n + 1)},
+        schema={"animal": pl.Int64, "sire": pl.Int64, "dam": pl.Int64},
+    )
+    counts = count_relatives(ped, sketch_size=n + 1)
+    assert counts.get_column("n_descendants").to_list()[0] == n
@@ -0,0 +1,62 @@
+import numpy as np
+
+from pedpol.index import PedigreeIndex, UnknownPosition, _csr_gather, _SortedRuns
+
+
+def test_index_includes_parents_without_own_record(ped_lit):
+    ped, lbls = ped_lit
+    index = PedigreeIndex.from_pedigree(ped, lbls)
+    assert len(index) == 21
+    assert index.has_record.sum() == ped.height
+
+
+def test_index_parent_arrays(ped_jv_index):
+    pos = ped_jv_index.positions([4, 3])
+    assert ped_jv_index.to_ids(ped_jv_index.sire[pos[:1]]).to_list() == [3]
+    assert ped_jv_index.dam[pos[1]] == UnknownPosition
+
+
+def test_index_positions_drops_unknown_ids(ped_jv_index):
+    assert ped_jv_index.positions([1, 99]).size == 1
+
+
+def test_index_progeny_of(ped_jv_index):
+    progeny = ped_jv_index.progeny_of(ped_jv_index.positions([3]))
+    assert sorted(ped_jv_index.to_ids(progeny).to_list()) == [4, 11, 15]
+
+
+def test_index_ancestors_of(ped_jv_index):
+    ancestors = ped_jv_index.ancestors_of(ped_jv_index.positions([6]))
+    assert len(ancestors) == 9
+
+
+def test_index_ancestors_of_excluding_ids_keeps_related_ids(ped_jv_index):
+    ancestors = ped_jv_index.ancestors_of(
+        ped_jv_index.positions([4, 3]), include_ids=False
+    )
+    assert ped_jv_index.to_ids(ancestors).sort().to_list() == [3, 9]
+
+
+def test_csr_gather():
+    offsets = np.array([0, 2, 2, 5])
+    values = np.array([10, 11, 20, 21, 22])
+    assert _csr_gather(offsets, values, np.array([2, 0])).tolist() == [
+        20,
+        21,
+        22,
+        10,
+        11,
+    ]
+    assert _csr_gather(offsets, values, np.array([1])).size == 0
+
+
+def test_sorted_runs_add_new():
+    rng = np.random.default_rng(1)
+    visited, expected = _SortedRuns(), set()
+    for _ in range(50):
+        keys = np.unique(rng.integers(0, 500, rng.integers(0, 40)))
+        new = visited.add_new(keys)
+        assert new.tolist() == sorted(set(keys.tolist()) - expected)
+        expected.update(new.tolist())
+    assert len(visited.runs) <= np.log2(len(expected)) + 1
+    assert np.concatenate(visited.runs).size == len(expected)
@@ -0,0 +1,71 @@
+import polars as pl
+import pytest
+
+from pedpol.mating import get_progeny_inbreeding
+from pedpol.relationships import compute_inbreeding, get_relationships
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_progeny_inbreeding_is_half_relationship(ped_jv, max_workers):
+    ped, lbls = ped_jv
+    sires, dams = [3, 4, 11, 5, 6, 99], [9, 1, 2, 10, 4, 13, 8]
+    blocks = list(
+        get_progeny_inbreeding(
+            ped, sires, dams, lbls, block_size=4, max_workers=max_workers
+        )
+    )
+    assert [block.height for block in blocks] == [4 * 7, 2 * 7]
+    grid = pl.concat(blocks)
+    assert grid.select("sire", "dam").rows() == [(s, d) for s in sires for d in dams]
+    relationships = get_relationships(ped, grid.select("sire", "dam"), lbls)
+    expected = relationships.get_column("relationship").fill_null(0) / 2
+    assert grid["inbreeding"].to_list() == pytest.approx(expected.to_list())
+    assert grid.filter(pl.col("sire") == 99)["inbreeding"].to_list() == [0] * 7
+
+
+def test_progeny_inbreeding_from_inbreeding(ped_basic):
+    lbls = ("Anim", "Sire", "Dam")
+    ids = ped_basic.get_column("Anim")
+    grid = pl.concat(get_progeny_inbreeding(ped_basic, ids, ids, lbls, max_workers=1))
+    from_inbreeding = pl.concat(
+        get_progeny_inbreeding(
+            compute_inbreeding(ped_basic, lbls),
+            ids,
+            ids,
+            lbls,
+            inbreeding_label="inbreeding",
+            max_workers=1,
+        )
+    )
+    assert from_inbreeding["inbreeding"].to_list() == pytest.approx(
+        grid["inbreeding"].to_list()
+    )
+    # progeny of a parent with itself
+    selfed = grid.filter(pl.col("sire") == pl.col("dam"))
+    inbreeding = compute_inbreeding(ped_basic, lbls)["inbreeding"]
+    assert selfed["inbreeding"].to_list() == pytest.approx(
+        ((1 + inbreeding) / 2).to_list()
+    )
+
+
+def test_progeny_inbreeding_interleaved(ped_jv, ped_basic):
+    ped, lbls = ped_jv
+    basic_lbls = ("Anim", "Sire", "Dam")
+    ids, basic_ids = [3, 4, 11, 5, 6], ped_basic.get_column("Anim")
+    expected = [
+        pl.concat(get_progeny_inbreeding(ped, ids, ids, lbls, block_size=1)),
+        pl.concat(
+            get_progeny_inbreeding(
+                ped_basic, basic_ids, basic_ids, basic_lbls, block_size=1
+            )
+        ),
+    ]
+    # blocks of two grids computed in turn in the same process
+    grids = zip(
+        get_progeny_inbreeding(ped, ids, ids, lbls, block_size=1),
+        get_progeny_inbreeding(
+            ped_basic, basic_ids, basic_ids, basic_lbls, block_size=1
+        ),
+    )
+    for grid, blocks in zip(expected, zip(*grids)):
+        assert pl.concat(blocks).equals(grid.head(sum(b.height for b in blocks)))
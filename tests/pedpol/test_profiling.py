@@ -0,0 +1,64 @@
+import polars as pl
+import pytest
+
+from pedpol.generations import classify_generations, get_ancestors_of
+from pedpol.index import PedigreeIndex
+from pedpol.profiling import Profiler
+from pedpol.validation import validate_pedigree
+
+
+@pytest.mark.parametrize("fused", [False, True])
+def test_profile_validate_pedigree(ped_errors, fused):
+    ped, lbls = ped_errors
+    profiler = Profiler()
+    is_valid, errors = validate_pedigree(ped, lbls, fused=fused, profiler=profiler)
+    assert not is_valid
+    assert errors.sort(pl.all()).equals(
+        validate_pedigree(ped, lbls, fused=fused)[1].sort(pl.all())
+    )
+    checks = profiler.to_frame().filter(pl.col("plan").is_not_null())
+    assert checks.get_column("stage").unique().to_list() == ["validate_pedigree"]
+    assert checks.get_column("rows").sum() == errors.height
+    assert "own parent" in checks.get_column("step")
+    assert (checks.get_column("seconds") >= 0).all()
+
+
+def test_profile_classify_generations(ped_jv):
+    ped, lbls = ped_jv
+    profiler = Profiler(explain=False)
+    generations = classify_generations(ped, lbls, profiler=profiler)
+    peels = profiler.to_frame().filter(step="peel")
+    assert peels.get_column("iteration").to_list() == list(range(peels.height))
+    assert peels.height == generations.get_column("generation").max() + 1
+    assert peels.get_column("rows").sum() == 15
+
+
+def test_profile_get_ancestors_of(ped_jv):
+    ped, lbls = ped_jv
+    profiler = Profiler()
+    ancestors = get_ancestors_of(ped, [1], pedigree_labels=lbls, profiler=profiler)
+    steps = profiler.to_frame()
+    assert steps.get_column("stage").unique().to_list() == ["get_ancestors_of"]
+    assert steps.get_column("step").unique().to_list() == ["generation"]
+    assert steps.get_column("plan").is_not_null().all()
+    assert steps.get_column("rows").to_list() == [2, 2, 0]
+    assert ancestors.height == 5
+
+
+@pytest.mark.parametrize("depth_label", [None, "depth"])
+def test_profile_get_ancestors_of_with_index(ped_jv, depth_label):
+    ped, lbls = ped_jv
+    profiler = Profiler()
+    index = PedigreeIndex.from_pedigree(ped, lbls)
+    get_ancestors_of(
+        ped,
+        [1],
+        pedigree_labels=lbls,
+        index=index,
+        depth_label=depth_label,
+        profiler=profiler,
+    )
+    laps = profiler.to_frame().filter(step="index generation")
+    assert laps.get_column("stage").unique().to_list() == ["get_ancestors_of"]
+    assert laps.get_column("iteration").to_list() == [0, 1, 2]
+    assert laps.get_column("rows").to_list() == [2, 2, 0]
@@ -0,0 +1,136 @@
+import numpy as np
+import polars as pl
+import pytest
+
+from pedpol.generations import classify_generations
+from pedpol.relationships import compute_inbreeding, get_ainverse, get_relationships
+
+
+def tabular_relationships(ped: pl.DataFrame, lbls) -> pl.DataFrame:
+    """Numerator relationship matrix by the tabular method, with animal order"""
+    animal, sire, dam = lbls
+    ped = classify_generations(ped, lbls).sort("generation", animal)
+    rank = {a: i for i, a in enumerate(ped.get_column(animal), start=1)}
+    sires = [rank.get(s, 0) for s in ped.get_column(sire)]
+    dams = [rank.get(d, 0) for d in ped.get_column(dam)]
+    a = np.zeros((ped.height + 1, ped.height + 1))
+    for i in range(1, ped.height + 1):
+        s, d = sires[i - 1], dams[i - 1]
+        a[i, i] = 1 + 0.5 * a[s, d]
+        for j in range(1, i):
+            a[i, j] = a[j, i] = 0.5 * (a[j, s] + a[j, d])
+    return ped.select(animal), a[1:, 1:]
+
+
+def test_inbreeding_matches_tabular_method(ped_basic):
+    lbls = ("Anim", "Sire", "Dam")
+    animals, a = tabular_relationships(ped_basic, lbls)
+    inbreeding = animals.join(
+        compute_inbreeding(ped_basic, lbls), on="Anim", maintain_order="left"
+    )
+    assert inbreeding["inbreeding"].to_numpy() == pytest.approx(np.diag(a) - 1)
+    assert inbreeding["inbreeding"].to_list()[-1] == pytest.approx(0.34375)
+
+
+def test_inbreeding_of_unsorted_pedigree(ped_jv):
+    ped, lbls = ped_jv
+    inbreeding = compute_inbreeding(ped, lbls)
+    assert inbreeding.get_column(lbls[0]).equals(ped.get_column(lbls[0]))
+    animals, a = tabular_relationships(ped, lbls)
+    inbreeding = animals.join(inbreeding, on=lbls[0], maintain_order="left")
+    assert inbreeding["inbreeding"].to_numpy() == pytest.approx(np.diag(a) - 1)
+
+
+def test_lazy_inbreeding_of_literal_pedigree(ped_lit_valid):
+    ped, lbls = ped_lit_valid
+    inbreeding = compute_inbreeding(ped.lazy(), lbls).collect()
+    assert inbreeding.filter(pl.col("inbreeding") > 0).to_dicts() == [
+        {"Child": "Helen", "Father": "Hein", "Mother": "Emily", "inbreeding": 0.125}
+    ]  # Hein & Emily are half-sibs
+
+
+def test_inbreeding_of_circular_pedigree(ped_circular):
+    with pytest.raises(ValueError, match="circular"):
+        compute_inbreeding(*ped_circular)
+
+
+def dense(triplets: pl.DataFrame, size: int) -> np.ndarray:
+    matrix = np.zeros((size, size))
+    rows, columns = triplets["row"].to_numpy() - 1, triplets["column"].to_numpy() - 1
+    matrix[rows, columns] = matrix[columns, rows] = triplets["value"].to_numpy()
+    return matrix
+
+
+def test_ainverse_with_inbreeding(ped_basic):
+    lbls = ("Anim", "Sire", "Dam")
+    ped = compute_inbreeding(ped_basic, lbls)
+    ainverse = get_ainverse(ped, lbls, inbreeding_label="inbreeding")
+    assert (ainverse["row"] >= ainverse["column"]).all()
+    _, a = tabular_relationships(ped_basic, lbls)
+    assert dense(ainverse, ped.height) == pytest.approx(np.linalg.inv(a))
+
+
+def test_ainverse_without_inbred_parents():
+    ped = pl.DataFrame(
+        {
+            "animal": [1, 2, 3, 4, 5],
+            "sire": [None, None, 1, 1, 4],
+            "dam": [None, None, 2, None, 3],
+        }
+    )
+    _, a = tabular_relationships(ped, ped.columns)
+    assert dense(get_ainverse(ped.lazy()), ped.height) == pytest.approx(
+        np.linalg.inv(a)
+    )
+
+
+def test_ainverse_streamed_to_parquet(ped_basic, tmp_path):
+    lbls = ("Anim", "Sire", "Dam")
+    get_ainverse(ped_basic, lbls, path=tmp_path / "ainv.parquet")
+    assert pl.read_parquet(tmp_path / "ainv.parquet").equals(
+        get_ainverse(ped_basic, lbls)
+    )
+
+
+@pytest.mark.parametrize("batch_size", [7, 4096])
+def test_relationships_match_tabular_method(ped_jv, batch_size):
+    ped, lbls = ped_jv
+    animals, a = tabular_relationships(ped, lbls)
+    animals = animals.get_column(lbls[0])
+    pairs = pl.DataFrame(
+        {
+            "first": animals.to_list() * animals.len(),
+            "second": animals.gather(
+                np.repeat(np.arange(animals.len()), animals.len())
+            ),
+        }
+    )
+    relationships = get_relationships(ped, pairs, lbls, batch_size=batch_size)
+    assert relationships.columns == ["first", "second", "relationship"]
+    assert relationships["relationship"].to_numpy() == pytest.approx(a.T.reshape(-1))
+
+
+def test_relationships_of_unknown_animals(ped_lit_valid):
+    ped, lbls = ped_lit_valid
+    pairs = pl.LazyFrame(
+        {
+            "id": [1, 2, 3],
+            "b": ["Hein", "Hein", "Nobody"],
+            "a": ["Emily", "Hein", "Hein"],
+        }
+    )
+    relationships = get_relationships(ped, pairs, lbls, pair_labels=("a", "b"))
+    assert relationships.collect()["relationship"].to_list() == [0.25, 1.0, None]
+
+
+def test_relationships_from_inbreeding(ped_basic):
+    lbls = ("Anim", "Sire", "Dam")
+    animals, a = tabular_relationships(ped_basic, lbls)
+    animals = animals.get_column("Anim")
+    pairs = pl.DataFrame({"first": animals, "second": animals.reverse()})
+    relationships = get_relationships(
+        compute_inbreeding(ped_basic, lbls), pairs, lbls, inbreeding_label="inbreeding"
+    )
+    assert relationships["relationship"].to_numpy() == pytest.approx(
+        np.fliplr(a).diagonal()
+    )
@@ -0,0 +1,53 @@
+import polars as pl
+import pytest
+
+from pedpol.generations import classify_generations
+from pedpol.simulate import PedigreeErrors, simulate_pedigree
+from pedpol.validation import validate_pedigree
+
+
+def test_simulate_pedigree_is_valid():
+    ped = simulate_pedigree(2_000, n_generations=6, unknown_rate=0.1, seed=1)
+    assert ped.height == 2_000
+    assert ped.columns == ["animal", "sire", "dam", "sex", "birth_year"]
+    assert ped.get_column("birth_year").n_unique() == 6
+    is_valid, errors = validate_pedigree(ped, age_label="birth_year", sex_label="sex")
+    assert is_valid, errors
+
+
+def test_simulate_pedigree_is_seeded():
+    assert simulate_pedigree(500, seed=3).equals(simulate_pedigree(500, seed=3))
+    assert not simulate_pedigree(500, seed=3).equals(simulate_pedigree(500, seed=4))
+
+
+def test_simulate_pedigree_founders():
+    ped = simulate_pedigree(1_000, founder_fraction=0.2, seed=1)
+    founders = ped.filter(pl.col("sire").is_null() & pl.col("dam").is_null())
+    assert founders.height == 200
+    assert classify_generations(ped).get_column("generation").max() <= 9
+
+
+def test_simulate_pedigree_literal_ids():
+    lbls = ("Child", "Father", "Mother")
+    ped = simulate_pedigree(100, literal_ids=True, seed=1, pedigree_labels=lbls)
+    assert ped.select(lbls).dtypes == 3 * [pl.String]
+    assert ped.get_column("Child").str.starts_with("A").all()
+    assert validate_pedigree(ped, lbls, age_label="birth_year")[0]
+
+
+def test_simulate_pedigree_errors():
+    errors = {kind: 2 for kind in PedigreeErrors}
+    ped = simulate_pedigree(1_000, errors=errors, seed=1)
+    assert ped.height == 1_002  # multiple records
+    _, found = validate_pedigree(ped, age_label="birth_year", sex_label="sex")
+    counts = dict(found.group_by("error").agg(pl.col("animal").n_unique()).iter_rows())
+    assert counts["is own parent"] == 2
+    assert counts["has no own record"] == 2
+    assert counts["is in circular pedigree"] == 4
+    assert counts["has multiple own records"] == 2
+    assert counts["is both sire and dam"] >= 2
+
+
+def test_simulate_pedigree_unknown_error():
+    with pytest.raises(ValueError, match="Unknown pedigree errors"):
+        simulate_pedigree(100, errors={"typo": 1})
@@ -0,0 +1,47 @@
+import json
+
+import numpy as np
+import pytest
+
+from pedpol.generations import get_ancestors_of
+from pedpol.index import PedigreeIndex
+from pedpol.store import PedigreeStore
+
+
+def test_store_round_trip(ped_lit, tmp_path):
+    ped, lbls = ped_lit
+    ped = ped.fill_null(".")  # unknown parents as in the csv
+    store = PedigreeStore.create(ped.lazy(), tmp_path / "store", lbls)
+    index = PedigreeIndex.from_pedigree(store.pedigree, lbls)
+    assert store.pedigree_labels == tuple(lbls)
+    assert store.pedigree.get_column(lbls[2]).null_count() == 1
+    assert store.scan().collect().equals(store.pedigree)
+
+    opened = PedigreeStore(tmp_path / "store")
+    assert opened.index.ids.equals(index.ids)
+    for array in ("sire", "dam", "has_record", "progeny_offsets", "progeny"):
+        assert np.array_equal(getattr(opened.index, array), getattr(index, array))
+    assert np.array_equal(opened.index.generations(), index.generations())
+    ids = ["Kristi", "Nobody"]
+    assert (
+        get_ancestors_of(opened.pedigree, ids, pedigree_labels=lbls, index=opened.index)
+        .sort(lbls[0])
+        .equals(
+            get_ancestors_of(store.pedigree, ids, pedigree_labels=lbls).sort(lbls[0])
+        )
+    )
+
+
+def test_store_version_mismatch(ped_jv, tmp_path):
+    ped, lbls = ped_jv
+    PedigreeStore.create(ped, tmp_path, lbls)
+    metadata = tmp_path / "metadata.json"
+    metadata.write_text(json.dumps({**json.loads(metadata.read_text()), "version": 0}))
+    with pytest.raises(ValueError, match="has version 0"):
+        PedigreeStore(tmp_path)
+
+
+def test_store_of_circular_pedigree(ped_circular, tmp_path):
+    ped, lbls = ped_circular
+    with pytest.raises(ValueError, match="their own ancestors"):
+        PedigreeStore.create(ped, tmp_path, lbls)
@@ -1,18 +1,24 @@
 import polars as pl
 import pytest
 
-from pedpol.core import parents
+from pedpol.core import assign_unknown_parent_groups, parents
+from pedpol.generations import classify_generations
 from pedpol.validation import (
     add_missing_records,
     get_animals_are_own_parent,
     get_animals_born_before_parents,
+    get_animals_in_circular_pedigree,
     get_animals_with_multiple_records,
     get_parent_sex_mismatches,
     get_parents_both_sires_and_dams,
     get_parents_without_own_record,
     null_parents_without_own_record,
+    read_id_map,
     recode_pedigree,
+    summarize_pedigree,
+    validate_increment,
     validate_pedigree,
+    write_id_map,
 )
 
 pl.Config.set_tbl_rows(15)
@@ -60,17 +66,55 @@ def test_no_anims_born_before_parents(ped_jv_classified):
     )
 
 
-def test_find_animals_born_before_their_parents(ped_circular_classified):
+def test_find_animals_born_before_their_parents(ped_circular):
+    ped, lbls = ped_circular
+    ped = ped.with_columns(pl.col(lbls[0]).alias("birth_order"))
     assert (
-        get_animals_born_before_parents(
-            *ped_circular_classified, age_label="generation"
-        ).height
-        > 0
+        get_animals_born_before_parents(ped, lbls, age_label="birth_order").height > 0
     )
 
 
-def test_classify_and_find_animals_born_before_their_parents(ped_circular):
-    assert get_animals_born_before_parents(*ped_circular).collect().height > 0
+def test_classify_circular_pedigree_to_find_animals_born_before_their_parents(
+    ped_circular,
+):
+    with pytest.raises(ValueError, match="circular"):
+        get_animals_born_before_parents(*ped_circular)
+
+
+def test_find_animals_in_circular_pedigree(ped_circular):
+    circular = get_animals_in_circular_pedigree(*ped_circular)
+    assert circular.sort("anim").to_dicts() == [
+        {"anim": 4, "sire": 1, "dam": 9, "cycle": 0},
+        {"anim": 7, "sire": 3, "dam": 4, "cycle": 0},
+        {"anim": 9, "sire": 8, "dam": 7, "cycle": 0},
+    ]
+
+
+def test_find_separate_circular_pedigrees():
+    ped = pl.DataFrame(
+        {
+            "animal": [1, 2, 3, 4, 5, 6],
+            "sire": [2, 1, None, 5, 4, 1],
+            "dam": [None, None, None, 3, None, 4],
+        }
+    )
+    circular = get_animals_in_circular_pedigree(ped)
+    assert circular.group_by("cycle").agg("animal").get_column(
+        "animal"
+    ).list.sort().sort().to_list() == [[1, 2], [4, 5]]
+
+
+def test_no_animals_in_circular_pedigree(ped_jv, ped_errors):
+    assert get_animals_in_circular_pedigree(*ped_jv).height == 0
+    assert get_animals_in_circular_pedigree(*ped_errors).height == 0  # own parent
+
+
+def test_validate_circular_pedigree(ped_circular):
+    valid, errors = validate_pedigree(*ped_circular)
+    assert not valid
+    assert errors.filter(error="is in circular pedigree").get_column(
+        "anim"
+    ).sort().to_list() == [4, 7, 9]
 
 
 def test_number_of_multiple_records_found(ped_errors):
@@ -133,6 +177,73 @@ def test_validate_invalid_pedigree(ped_errors):
     assert errors.height > 0
 
 
+def test_validate_pedigree_streamed_to_parquet(ped_errors_sex, tmp_path):
+    ped, lbls = ped_errors_sex
+    ped.write_parquet(tmp_path / "ped.parquet")
+    valid, errors = validate_pedigree(
+        pl.scan_parquet(tmp_path / "ped.parquet"),
+        lbls,
+        sex_label="sex",
+        sex_codes=(1, 2),
+        path=tmp_path / "errors.parquet",
+    )
+    assert not valid
+    assert isinstance(errors, pl.LazyFrame)
+    _, in_memory_errors = validate_pedigree(
+        ped, lbls, sex_label="sex", sex_codes=(1, 2)
+    )
+    assert (
+        errors.collect()
+        .sort(pl.all())
+        .equals(
+            in_memory_errors.filter(
+                ~pl.col("error").str.starts_with("was born before")
+            ).sort(pl.all())
+        )
+    )
+
+
+def test_validate_valid_pedigree_streamed_with_age(ped_jv_classified, tmp_path):
+    ped, lbls = ped_jv_classified
+    valid, errors = validate_pedigree(
+        ped.lazy(), lbls, age_label="generation", path=tmp_path / "errors.parquet"
+    )
+    assert valid
+    assert errors.collect().height == 0
+
+
+@pytest.mark.parametrize("age_label", [None, "generation"])
+def test_fused_validation_finds_same_errors(ped_errors_sex, age_label):
+    ped, lbls = ped_errors_sex
+    if age_label:
+        ped = ped.with_columns(pl.col(lbls[0]).alias(age_label))
+    errors = [
+        validate_pedigree(ped, lbls, age_label=age_label, sex_label="sex", fused=fused)[
+            1
+        ].sort(pl.all())
+        for fused in (False, True)
+    ]
+    assert errors[0].height > 0
+    assert errors[1].equals(errors[0])
+
+
+def test_fused_validation_of_literal_pedigrees(ped_lit, ped_lit_valid):
+    for ped, lbls in (ped_lit, ped_lit_valid):
+        errors = [
+            validate_pedigree(ped, lbls, fused=fused)[1].sort(pl.all())
+            for fused in (False, True)
+        ]
+        assert errors[1].equals(errors[0])
+
+
+def test_fused_validation_of_circular_pedigree(ped_circular):
+    errors = [
+        validate_pedigree(*ped_circular, fused=fused)[1].sort(pl.all())
+        for fused in (False, True)
+    ]
+    assert errors[1].equals(errors[0])
+
+
 def test_add_record_for_parents_without_their_own(ped_errors):
     assert add_missing_records(*ped_errors).height == (ped_errors[0].height + 1)
 
@@ -173,3 +284,208 @@ def test_recode_ids(ped_lit):
         20,
         21,
     ]
+
+
+def test_recode_ids_sorted_by_generation(ped_jv):
+    ped, lbls = ped_jv
+    animal, sire, dam = lbls
+    recoded_ped, id_map = recode_pedigree(ped, lbls, sort=True, downcast=True)
+    assert recoded_ped.schema[animal] == recoded_ped.schema[sire] == pl.UInt8
+    assert recoded_ped.filter(
+        (pl.col(sire) >= pl.col(animal)) | (pl.col(dam) >= pl.col(animal))
+    ).is_empty()
+    assert id_map.get_column(animal).head(2).sort().to_list() == [3, 9]  # founders
+    decoded = recoded_ped.with_columns(
+        pl.col(col).replace_strict(id_map["recoded"], id_map[animal], default=None)
+        for col in lbls
+    )
+    assert decoded.sort(animal).equals(ped.sort(animal))
+
+
+def test_recode_ids_sorted_by_age(ped_lit_valid):
+    ped, lbls = ped_lit_valid
+    ped = classify_generations(ped, lbls).rename({"generation": "birth_year"})
+    recoded_ped, _ = recode_pedigree(
+        ped.lazy(), lbls, sort=True, age_label="birth_year"
+    )
+    recoded_ped = recoded_ped.collect()
+    assert recoded_ped.schema[lbls[0]] == pl.UInt32
+    assert recoded_ped.get_column("birth_year").is_sorted()
+
+
+def test_recode_ids_sorted_by_inconsistent_age(ped_jv):
+    ped, lbls = ped_jv
+    with pytest.raises(ValueError, match="numbered after their parents"):
+        recode_pedigree(ped, lbls, sort=True, age_label=lbls[0])
+
+
+def test_recode_ids_with_multiple_records(ped_errors):
+    ped, lbls = ped_errors
+    with pytest.raises(ValueError, match="multiple records"):
+        recode_pedigree(add_missing_records(ped, lbls), lbls)
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".arrow"])
+def test_recode_ids_incrementally(ped_jv_classified, tmp_path, suffix):
+    ped, lbls = ped_jv_classified
+    ped = ped.sort("generation", maintain_order=True)
+    full_ped, full_map = recode_pedigree(ped, lbls)
+    base, batch = ped.head(8), ped.tail(ped.height - 8)
+    base_ped, base_map = recode_pedigree(base, lbls)
+    write_id_map(base_map, path := tmp_path / f"id_map{suffix}")
+    assert read_id_map(path).equals(base_map)
+    batch_ped, id_map = recode_pedigree(batch, lbls, id_map=path)
+    assert batch_ped.height == batch.height
+    assert id_map.equals(full_map)
+    assert pl.concat([base_ped, batch_ped]).equals(full_ped)
+
+
+def test_recode_ids_incrementally_with_updated_record(ped_jv):
+    ped, lbls = ped_jv
+    recoded_ped, id_map = recode_pedigree(ped, lbls)
+    batch_ped, new_map = recode_pedigree(ped.tail(1).lazy(), lbls, id_map=id_map.lazy())
+    assert new_map.collect().equals(id_map)
+    assert batch_ped.collect().equals(recoded_ped.tail(1))
+
+
+def test_recode_ids_incrementally_with_signed_id_map(ped_jv):
+    ped, lbls = ped_jv
+    recoded_ped, id_map = recode_pedigree(ped, lbls)
+    signed_map = id_map.with_columns(pl.col("recoded").cast(pl.Int64))
+    batch_ped, new_map = recode_pedigree(ped.tail(1), lbls, id_map=signed_map)
+    assert new_map.equals(id_map.with_columns(pl.col("recoded").cast(pl.UInt64)))
+    assert batch_ped.equals(recoded_ped.tail(1).cast({lbl: pl.UInt64 for lbl in lbls}))
+    negative_map = signed_map.with_columns(-pl.col("recoded"))
+    with pytest.raises(ValueError, match="recoded ids in the id map are negative"):
+        recode_pedigree(ped.tail(1), lbls, id_map=negative_map)
+
+
+def test_recode_ids_incrementally_with_unknown_parent(ped_jv):
+    ped, lbls = ped_jv
+    _, id_map = recode_pedigree(ped, lbls)
+    batch = pl.DataFrame({lbls[0]: [100], lbls[1]: [101], lbls[2]: [None]})
+    with pytest.raises(ValueError, match="did not have their own record"):
+        recode_pedigree(batch, lbls, id_map=id_map)
+
+
+@pytest.fixture
+def ped_jv_summary(ped_jv_classified, tmp_path):
+    ped, lbls = ped_jv_classified
+    ped = ped.with_columns(
+        pl.when(pl.col(lbls[0]).is_in(ped[lbls[1]].drop_nulls().to_list()))
+        .then(pl.lit("M"))
+        .otherwise(pl.lit("F"))
+        .alias("sex")
+    )
+    summary = summarize_pedigree(ped, lbls, "generation", "sex")
+    summary.write_parquet(path := tmp_path / "summary.parquet")
+    return ped, lbls, path
+
+
+def test_summarize_pedigree(ped_jv_summary):
+    _ped, lbls, path = ped_jv_summary
+    summary = pl.read_parquet(path)
+    assert summary.columns == [lbls[0], "generation", "sex", "is_sire", "is_dam"]
+    assert summary.filter("is_sire")[lbls[0]].sort().to_list() == [
+        2,
+        3,
+        4,
+        5,
+        6,
+        11,
+        14,
+    ]
+    assert summary.filter("is_dam")[lbls[0]].sort().to_list() == [
+        1,
+        8,
+        9,
+        10,
+        12,
+        13,
+        15,
+    ]
+
+
+def test_summarize_pedigree_increment(ped_jv_summary):
+    ped, lbls, path = ped_jv_summary
+    ped = ped.sort("generation", maintain_order=True)
+    base, batch = ped.head(10), ped.tail(5)
+    summary = summarize_pedigree(base, lbls, "generation", "sex")
+    summary = summarize_pedigree(batch.lazy(), lbls, "generation", "sex", summary)
+    assert summary.collect().sort(lbls[0]).equals(pl.read_parquet(path).sort(lbls[0]))
+
+
+def test_validate_valid_increment(ped_jv_summary):
+    ped, lbls, path = ped_jv_summary
+    batch = pl.DataFrame(
+        {lbls[0]: [16, 17], lbls[1]: [2, 16], lbls[2]: [1, 7]},
+        schema=ped.select(lbls).schema,
+    ).with_columns(generation=pl.Series([7, 8]), sex=pl.Series(["M", "F"]))
+    is_valid, errors = validate_increment(
+        path, batch, lbls, "generation", "sex", ("M", "F")
+    )
+    assert is_valid
+    assert errors.columns == [*ped.columns, "error"]
+
+
+def test_validate_increment_errors(ped_jv_summary):
+    ped, lbls, path = ped_jv_summary
+    batch = pl.DataFrame(
+        {
+            lbls[0]: [16, 17, 3, 18, 19, 21],
+            lbls[1]: [2, 20, None, 18, 12, 2],
+            lbls[2]: [1, 1, None, 1, 13, 1],
+        },
+        schema=ped.select(lbls).schema,
+    ).with_columns(
+        generation=pl.Series([7, 7, 0, 7, 7, 0], dtype=pl.Int32),
+        sex=pl.Series(["M"] * 6),
+    )
+    is_valid, errors = validate_increment(
+        path, batch, lbls, "generation", "sex", ("M", "F")
+    )
+    assert not is_valid
+    assert sorted(errors.select(lbls[0], "error").iter_rows()) == [
+        (3, "has multiple own records"),
+        (12, "is both sire and dam"),
+        (12, "wrong sex for parental role"),
+        (18, "is own parent"),
+        (18, "was born before sire"),
+        (20, "has no own record"),
+        (21, "was born before dam"),
+        (21, "was born before sire"),
+    ]
+    # errors agree with validating the whole pedigree
+    _, full_errors = validate_pedigree(
+        pl.concat([ped, batch]), lbls, "generation", "sex", ("M", "F")
+    )
+    assert sorted(errors.select(lbls[0], "error").iter_rows()) == sorted(
+        full_errors.select(lbls[0], "error").unique().iter_rows()
+    )
+
+
+def test_validate_circular_increment(ped_jv_summary):
+    ped, lbls, path = ped_jv_summary
+    batch = pl.DataFrame(
+        {lbls[0]: [16, 17], lbls[1]: [17, 16], lbls[2]: [1, 1]},
+        schema=ped.select(lbls).schema,
+    )
+    _is_valid, errors = validate_increment(path, batch, lbls)
+    assert errors.filter(error="is in circular pedigree").height == 2
+
+
+def test_recode_ids_with_unknown_parent_groups(ped_breed_jv):
+    ped, lbls = ped_breed_jv
+    animal, sire, dam = lbls
+    grouped, groups = assign_unknown_parent_groups(ped, ["breed"], lbls)
+    with pytest.raises(ValueError, match="did not have their own record"):
+        recode_pedigree(grouped, lbls)
+    recoded_ped, id_map = recode_pedigree(
+        grouped, lbls, sort=True, unknown_parent_groups=groups
+    )
+    assert id_map.height == ped.height + groups.height
+    assert id_map.head(groups.height).get_column(animal).equals(groups[animal])
+    assert recoded_ped.filter(
+        (pl.col(sire) >= pl.col(animal)) | (pl.col(dam) >= pl.col(animal))
+    ).is_empty()
+    assert recoded_ped.select(sire, dam).max_horizontal().min() <= groups.height